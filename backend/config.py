@@ -4,114 +4,203 @@ Configuration file for BRD Agent
 Centralizes all constants, limits, and configuration values
 """
 
+import functools
 import os
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Any, Mapping
 
 def _load_environment():
-    """Load environment variables from .env file"""
+    """Load environment variables from .env file (only once per process)"""
+    if getattr(_load_environment, "_done", False):
+        return _load_environment._loaded
     try:
         from dotenv import load_dotenv
         load_dotenv()
-        return True
+        _load_environment._loaded = True
     except ImportError:
-        return False
+        _load_environment._loaded = False
+    _load_environment._done = True
+    return _load_environment._loaded
 
-def _get_env(key: str, default: str = None, convert_type=None):
-    """Get environment variable with optional type conversion"""
-    value = os.getenv(key, default)
-    if convert_type and value is not None:
-        try:
-            return convert_type(value)
-        except (ValueError, TypeError):
-            return default
-    return value
+def _env_str(key: str, default: str = None) -> str:
+    """Get a string environment variable"""
+    return os.environ.get(key, default)
 
-# Load environment variables immediately
-_load_environment()
+def _env_int(key: str, default: int) -> int:
+    """Get an integer environment variable, falling back to default if unset or invalid"""
+    value = os.environ.get(key)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+def _env_bool(key: str, default: bool) -> bool:
+    """Get a boolean environment variable; only "true" (any case) counts as true"""
+    value = os.environ.get(key)
+    return value.lower() == "true" if value is not None else default
+
+def _parse_origins(value: str) -> tuple:
+    """Split a comma-separated origins string, dropping blanks and whitespace"""
+    return tuple(origin.strip() for origin in value.split(",") if origin.strip())
+
+@functools.lru_cache(maxsize=4)
+def _validate_cached(secret_present: bool, google_ok: bool, host: str, debug: bool) -> Mapping[str, Any]:
+    """Build the validation report for a given set of settings"""
+    warnings = []
+    
+    # Check required configurations
+    if not secret_present:
+        warnings.append("SECRET_KEY not set - will generate random key")
+    
+    if not google_ok:
+        warnings.append("GOOGLE_API_KEY not set - LLM features will use fallback mode")
+    
+    # Check security configurations
+    if host == "0.0.0.0" and not debug:
+        warnings.append("Running in production with 0.0.0.0 host - consider restricting")
+    
+    return MappingProxyType({
+        'valid': True,
+        'warnings': tuple(warnings),
+        'errors': ()
+    })
 
 class Config:
     """Centralized configuration for BRD Agent"""
     
+    # Environment-derived values are populated once by _build()
+    _built = False
+    _llm_config = None
+    _file_config = None
+    
     # API Configuration
-    API_HOST = _get_env("HOST", "0.0.0.0")
-    API_PORT = _get_env("PORT", 8000, int)
-    API_DEBUG = _get_env("DEBUG", "False", lambda x: x.lower() == "true")
+    API_HOST = None
+    API_PORT = None
+    API_DEBUG = None
     
     # Security Configuration
-    SECRET_KEY = _get_env("SECRET_KEY")
-    CORS_ORIGINS = _get_env("ALLOWED_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000").split(",")
-    CORS_CREDENTIALS = _get_env("CORS_CREDENTIALS", "true", lambda x: x.lower() == "true")
+    SECRET_KEY = None
+    CORS_ORIGINS = None
+    CORS_CREDENTIALS = None
     
     # Google Gemini Configuration
-    GOOGLE_API_KEY = _get_env("GOOGLE_API_KEY")
-    GOOGLE_MODEL = _get_env("GOOGLE_MODEL", "gemini-2.0-flash")
+    GOOGLE_API_KEY = None
+    GOOGLE_MODEL = None
+    GOOGLE_API_OK = False
+    
+    # Shared State Configuration
+    REDIS_URL = None
+    REDIS_SOCKET_TIMEOUT_SECONDS = 0.5  # Connect and read timeout for Redis calls
     
     # LLM Configuration
     MAX_INPUT_LENGTH = 5000
     MAX_OUTPUT_TOKENS = 4000
     LLM_TEMPERATURE = 0.3
+    PROMPT_CACHE_TTL_SECONDS = 1800  # 30 minutes
+    GEMINI_MAX_CONCURRENCY = 8  # Concurrent async Gemini calls per process
+    BATCH_POLL_INTERVAL_SECONDS = 30
+    BATCH_TIMEOUT_SECONDS = 24 * 3600  # Gemini batch jobs expire after 24 hours
     
     # File Processing Configuration
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
     MAX_FILES_COUNT = 10
     MAX_FILE_CONTENT_LENGTH = 50000
+    # Raw request body cap, checked from Content-Length before the JSON is parsed.
+    # Leaves headroom over the 100KB content limit for JSON escaping and multi-byte text.
+    MAX_REQUEST_BODY_SIZE = 512 * 1024
     
     # BRD Configuration
     MAX_PROJECT_NAME_LENGTH = 50
     MIN_PROJECT_DESCRIPTION_LENGTH = 10
     MAX_PROJECT_DESCRIPTION_LENGTH = 5000
     
+    # Response Cache Configuration
+    BRD_CACHE_MAX_ENTRIES = 256
+    BRD_CACHE_TTL_SECONDS = 3600  # 1 hour
+    BRD_ANALYSIS_CACHE_MAX_ENTRIES = 128
+    BRD_IMPROVEMENT_CACHE_MAX_ENTRIES = 64
+    BRD_RESULT_CACHE_MAX_ENTRIES = 128
+    
+    # Background Job Configuration
+    JOB_MAX_ENTRIES = 1000
+    JOB_RESULT_TTL_SECONDS = 3600  # 1 hour
+    
     # Rate Limiting Configuration
     RATE_LIMIT_MAX_REQUESTS = 100
     RATE_LIMIT_WINDOW_SECONDS = 3600  # 1 hour
+    RATE_LIMIT_MAX_CLIENTS = 100000  # Least recently seen clients are forgotten beyond this
     
     # Validation Rules
-    VALID_FILE_TYPES = [
+    VALID_FILE_TYPES = frozenset({
         'application/pdf',
         'text/markdown', 
         'text/x-markdown',
         'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-    ]
+    })
     
     @classmethod
-    def validate(cls) -> Dict[str, Any]:
-        """Validate configuration and return status"""
-        validation_results = {
-            'valid': True,
-            'warnings': [],
-            'errors': []
-        }
+    def _build(cls):
+        """Snapshot environment-derived settings into class attributes (runs once)"""
+        if cls._built:
+            return
         
-        # Check required configurations
-        if not cls.SECRET_KEY:
-            validation_results['warnings'].append("SECRET_KEY not set - will generate random key")
+        _load_environment()
         
-        if not cls.GOOGLE_API_KEY or cls.GOOGLE_API_KEY.startswith('your_'):
-            validation_results['warnings'].append("GOOGLE_API_KEY not set - LLM features will use fallback mode")
+        # API Configuration
+        cls.API_HOST = _env_str("HOST", "0.0.0.0")
+        cls.API_PORT = _env_int("PORT", 8000)
+        cls.API_DEBUG = _env_bool("DEBUG", False)
         
-        # Check security configurations
-        if cls.API_HOST == "0.0.0.0" and not cls.API_DEBUG:
-            validation_results['warnings'].append("Running in production with 0.0.0.0 host - consider restricting")
+        # Security Configuration
+        cls.SECRET_KEY = _env_str("SECRET_KEY")
+        cls.CORS_ORIGINS = _parse_origins(_env_str("ALLOWED_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000"))
+        cls.CORS_CREDENTIALS = _env_bool("CORS_CREDENTIALS", True)
         
-        return validation_results
-    
-    @classmethod
-    def get_llm_config(cls) -> Dict[str, Any]:
-        """Get LLM-specific configuration"""
-        return {
+        # Google Gemini Configuration
+        cls.GOOGLE_API_KEY = _env_str("GOOGLE_API_KEY")
+        cls.GOOGLE_MODEL = _env_str("GOOGLE_MODEL", "gemini-2.0-flash")
+        cls.GOOGLE_API_OK = bool(cls.GOOGLE_API_KEY) and not cls.GOOGLE_API_KEY.startswith('your_')
+        
+        # Shared state (optional): enables cross-worker rate limiting
+        cls.REDIS_URL = _env_str("REDIS_URL")
+        
+        # Derived read-only views, built once instead of per call
+        cls._llm_config = MappingProxyType({
             'model': cls.GOOGLE_MODEL,
             'max_output_tokens': cls.MAX_OUTPUT_TOKENS,
             'temperature': cls.LLM_TEMPERATURE
-        }
-    
-    @classmethod
-    def get_file_config(cls) -> Dict[str, Any]:
-        """Get file processing configuration"""
-        return {
+        })
+        cls._file_config = MappingProxyType({
             'max_size': cls.MAX_FILE_SIZE,
             'max_count': cls.MAX_FILES_COUNT,
             'max_content_length': cls.MAX_FILE_CONTENT_LENGTH,
-            'valid_types': cls.VALID_FILE_TYPES
-        }
+            'valid_types': tuple(sorted(cls.VALID_FILE_TYPES))  # JSON-friendly, stable order
+        })
+        
+        cls._built = True
     
+    @classmethod
+    def validate(cls) -> Mapping[str, Any]:
+        """Validate configuration and return status (memoized per settings snapshot)"""
+        return _validate_cached(
+            bool(cls.SECRET_KEY),
+            cls.GOOGLE_API_OK,
+            cls.API_HOST,
+            bool(cls.API_DEBUG)
+        )
+    
+    @classmethod
+    def get_llm_config(cls) -> Mapping[str, Any]:
+        """Get LLM-specific configuration (cached, read-only)"""
+        return cls._llm_config
+    
+    @classmethod
+    def get_file_config(cls) -> Mapping[str, Any]:
+        """Get file processing configuration (cached, read-only)"""
+        return cls._file_config
+
 
+# Load environment variables and snapshot configuration immediately
+Config._build()
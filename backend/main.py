@@ -3,29 +3,45 @@
 FastAPI application for BRD Agent - LLM-Powered with Google Gemini Integration
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import uvicorn
 import os
+import json
+import atexit
 import logging
+import logging.handlers
+import queue
+import secrets
+import sys
+import time
+import traceback
 from datetime import datetime, timezone
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+class _BoundedTracebackFormatter(logging.Formatter):
+    """Formatter that keeps only the innermost frames of logged tracebacks"""
+    
+    TRACEBACK_LIMIT = 10
+    
+    def formatException(self, ei):
+        return "".join(traceback.format_exception(*ei, limit=-self.TRACEBACK_LIMIT)).rstrip("\n")
+
+# Configure logging: records are queued and written by a background listener
+# thread so request handlers never block on stdout
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler(), respect_handler_level=True)
+_log_handler = logging.handlers.QueueHandler(_log_queue)
+_log_handler.setFormatter(_BoundedTracebackFormatter(logging.BASIC_FORMAT))
+logging.basicConfig(level=logging.INFO, handlers=[_log_handler])
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
-# Load environment variables first, before importing any other modules
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    pass  # dotenv not available, using system environment variables
-except Exception:
-    pass  # Error loading .env file, using system environment variables
+# Load environment variables first (config loads .env once on import)
+from config import Config
 
 from routes.llm_routes import router as llm_router
-from services.llm_service import LLMService
-from config import Config
 
 def validate_environment():
     """Validate required environment variables"""
@@ -51,12 +67,8 @@ def validate_environment():
     
     return True
 
-# Load environment variables
-load_dotenv()
-
 # Set default SECRET_KEY for development if not provided
 if not os.environ.get('SECRET_KEY'):
-    import secrets
     os.environ['SECRET_KEY'] = secrets.token_urlsafe(32)
     print("⚠️ Generated random SECRET_KEY for development")
 
@@ -69,6 +81,19 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Reject oversized bodies before they are read and parsed. Only the declared Content-Length is
+# checked: chunked requests without one pass through and must be bounded by the server or proxy.
+# Registered before CORS so the CORS middleware wraps it and the 413 still carries CORS headers.
+@app.middleware("http")
+async def limit_request_body_size(request: Request, call_next):
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > Config.MAX_REQUEST_BODY_SIZE:
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Request body exceeds {Config.MAX_REQUEST_BODY_SIZE} bytes"}
+        )
+    return await call_next(request)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -78,71 +103,75 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize LLM service
-llm_service = LLMService()
-
 # Include routers
 app.include_router(llm_router, prefix="/api", tags=["LLM"])
 
+# Static payloads for / and /api-info, encoded once at startup
+def _encode_json(payload: dict) -> bytes:
+    """Encode a payload the same way Starlette's JSONResponse does"""
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+_ROOT_BODY = _encode_json({
+    "message": "BRD Agent API",
+    "frontend_url": "http://localhost:3000",
+    "api_docs": "/docs",
+    "health_check": "/health"
+})
+
+_API_INFO_BODY = _encode_json({
+    'message': 'BRD Agent - LLM-Powered API with Google Gemini Integration',
+    'version': '3.0.0',
+    'framework': 'FastAPI',
+    'database': 'None (In-Memory Storage)',
+    'endpoints': {
+        'generate_brd_from_input': '/api/generate_brd_from_input',
+        'generate_brd_with_files': '/api/generate_brd_with_files',
+        'download_brd': '/api/download_brd/{project_name}'
+    },
+    'llm_provider': {
+        'google_gemini': f'Primary provider - Direct access to {Config.GOOGLE_MODEL} model for BRD generation and improvement'
+    },
+    'features': {
+        'brd_generation': 'Generate new BRD documents from text input and files',
+        'brd_improvement': 'Analyze and improve existing BRD documents using AI',
+        'file_processing': 'Support for PDF, Markdown, and DOCX files',
+        'ai_enhancement': 'AI-powered content analysis and improvement'
+    },
+    'usage': 'Use the web interface at / for BRD generation and improvement'
+})
+
 # Root route - Redirect to frontend
 @app.get("/")
 async def root():
     """Redirect to frontend application"""
-    return {
-        "message": "BRD Agent API",
-        "frontend_url": "http://localhost:3000",
-        "api_docs": "/docs",
-        "health_check": "/health"
-    }
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 # API info route
 @app.get("/api-info")
 async def api_info():
     """Get API information"""
-    return {
-        'message': 'BRD Agent - LLM-Powered API with Google Gemini Integration',
-        'version': '3.0.0',
-        'framework': 'FastAPI',
-        'database': 'None (In-Memory Storage)',
-        'endpoints': {
-            'generate_brd_from_input': '/api/generate_brd_from_input',
-            'generate_brd_with_files': '/api/generate_brd_with_files',
-            'download_brd': '/api/download_brd/{project_name}'
-        },
-        'llm_provider': {
-            'google_gemini': f'Primary provider - Direct access to {Config.GOOGLE_MODEL} model for BRD generation and improvement'
-        },
-        'features': {
-            'brd_generation': 'Generate new BRD documents from text input and files',
-            'brd_improvement': 'Analyze and improve existing BRD documents using AI',
-            'file_processing': 'Support for PDF, Markdown, and DOCX files',
-            'ai_enhancement': 'AI-powered content analysis and improvement'
-        },
-        'usage': 'Use the web interface at / for BRD generation and improvement'
-    }
+    return Response(content=_API_INFO_BODY, media_type="application/json")
+
+# Health check timestamp, reformatted at most once per second
+_ts_cache = [0, ""]
+
+def _health_timestamp() -> str:
+    """Return the current UTC ISO timestamp at one-second resolution"""
+    sec = int(time.time())
+    if sec != _ts_cache[0]:
+        _ts_cache[:] = [sec, datetime.fromtimestamp(sec, timezone.utc).isoformat()]
+    return _ts_cache[1]
 
 # Health check
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     try:
-        # Check LLM service status
-        llm_status = "available"
-        
-        # Simple check if Google API key is configured
-        google_key = Config.GOOGLE_API_KEY
-        if google_key and not google_key.startswith('your_'):
-            llm_status = "available"
-        else:
-            llm_status = "fallback_mode"  # Service works but with fallback
-        
         # Service is healthy even in fallback mode
-        overall_status = "healthy"
-        
         return {
-            "status": overall_status,
-            "llm_service": llm_status,
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "status": "healthy",
+            "llm_service": "available" if Config.GOOGLE_API_OK else "fallback_mode",
+            "timestamp": _health_timestamp()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -162,12 +191,10 @@ if __name__ == "__main__":
     # Validate environment configuration
     if not validate_environment():
         print("❌ Environment validation failed. Please check your .env file.")
-        import sys
         sys.exit(1)
     
     # Check Google API key (minimal output)
-    google_key = Config.GOOGLE_API_KEY
-    if google_key and not google_key.startswith('your_'):
+    if Config.GOOGLE_API_OK:
         logger.info("✅ Google Gemini configured")
     else:
         logger.warning("⚠️ Using fallback mode (no API key)")
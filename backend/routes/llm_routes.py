@@ -3,28 +3,74 @@
 LLM-powered routes for automatic BRD generation using FastAPI
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Request
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, Dict, Any, Tuple
 from services.llm_service import LLMService
-from services.brd import BusinessRequirementAgent
+from services.brd import BusinessRequirementAgent, BRDSchema
+from services.brd_cache import brd_cache, brd_analysis_cache
+from config import Config
 
 from utils.rate_limiter import rate_limiter
+from utils.job_queue import brd_jobs
+import asyncio
+import copy
+import functools
+import hashlib
 import json
+import logging
+import re
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
 
 # Create FastAPI router
 router = APIRouter()
 
-# Initialize services
-llm_service = LLMService()
+# One-pass filename sanitizing for downloads: no path separators, quotes or control characters
+_FILENAME_SANITIZE_TABLE = str.maketrans({' ': '_', '/': '_', '\\': '_', '"': '_', '\x00': None, '\r': None, '\n': None})
+
+# Filenames that indicate the user uploaded an existing BRD to improve
+_EXISTING_BRD_RE = re.compile(r'brd|business requirements|requirements document', re.IGNORECASE)
+
+# Services are created lazily on first use
+_llm_service: Optional[LLMService] = None
+
+def get_llm_service() -> LLMService:
+    """Return the shared LLM service, creating it on first request"""
+    global _llm_service
+    if _llm_service is None:
+        _llm_service = LLMService()
+    return _llm_service
+
+_DEFAULT_PROJECT_NAME = "Project"
+
+# Default values for top-level keys the LLM may leave out of its BRD data
+_BRD_DEFAULTS = {
+    'project_name': _DEFAULT_PROJECT_NAME,
+    'stakeholders': [],
+    'objectives': [],
+    'scope': {'in_scope': [], 'out_scope': []},
+    'requirements': {'business': [], 'functional': [], 'non_functional': []},
+    'assumptions': [],
+    'constraints': [],
+    'success_criteria': []
+}
+
+def apply_brd_defaults(brd_data: Dict[str, Any]) -> list:
+    """Fill in missing top-level BRD keys in place and return the keys that were added"""
+    missing_keys = [key for key in _BRD_DEFAULTS if key not in brd_data]
+    for key in missing_keys:
+        brd_data[key] = copy.deepcopy(_BRD_DEFAULTS[key])
+    return missing_keys
 
 async def check_rate_limit(request: Request):
     """Check rate limit for the request"""
     client_id = request.client.host if request.client else "unknown"
     
-    if not rate_limiter.is_allowed(client_id):
-        remaining_time = rate_limiter.get_reset_time(client_id)
+    allowed, remaining_time = await rate_limiter.acheck(client_id)
+    if not allowed:
         raise HTTPException(
             status_code=429,
             detail={
@@ -42,13 +88,15 @@ class ProjectDescriptionRequest(BaseModel):
     project_description: str
     model: Optional[str] = None
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        extra='ignore',
+        json_schema_extra={
             "example": {
                 "project_description": "We need to build a modern e-commerce platform for our retail business. The system should include product catalog, shopping cart, payment processing, order management, and user account management.",
                 "model": "gemini-2.0-flash"
             }
         }
+    )
     
     def validate_project_description(self):
         """Validate project description length and content"""
@@ -61,8 +109,11 @@ class ProjectDescriptionRequest(BaseModel):
 
 
 class UploadedFile(BaseModel):
+    model_config = ConfigDict(extra='ignore')
+    
     filename: str
-    content: str
+    # No single file can fit under the 100KB total content limit past this size
+    content: str = Field(max_length=100000)
     type: str
 
 class ProjectDescriptionWithFilesRequest(BaseModel):
@@ -70,8 +121,9 @@ class ProjectDescriptionWithFilesRequest(BaseModel):
     uploaded_files: list[UploadedFile] = []
     model: Optional[str] = None
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        extra='ignore',
+        json_schema_extra={
             "example": {
                 "project_description": "We need to build a modern e-commerce platform for our retail business. The system should include product catalog, shopping cart, payment processing, order management, and user account management.",
                 "uploaded_files": [
@@ -84,10 +136,11 @@ class ProjectDescriptionWithFilesRequest(BaseModel):
                 "model": "gemini-2.0-flash"
             }
         }
+    )
     
     def validate_input(self):
         """Validate input length and content"""
-        if not self.project_description.strip() and not self.uploaded_files:
+        if (not self.project_description or self.project_description.isspace()) and not self.uploaded_files:
             raise ValueError("Either project description or uploaded files must be provided")
         
         if self.project_description and len(self.project_description.strip()) < 10:
@@ -101,7 +154,30 @@ class ProjectDescriptionWithFilesRequest(BaseModel):
         
         return True
 
+class RequirementsCount(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    
+    business: int
+    functional: int
+    non_functional: int
+
+class SummaryData(BaseModel):
+    # Extra keys carry mode-specific details (files_processed, improvement stats)
+    model_config = ConfigDict(frozen=True, extra='allow')
+    
+    stakeholders_count: int
+    objectives_count: int
+    requirements_count: RequirementsCount
+    assumptions_count: int
+    constraints_count: int
+    success_criteria_count: int
+    completeness_score: float
+    completeness_status: str
+    intelligent_prompt: Optional[str] = None
+
 class BRDResponse(BaseModel):
+    model_config = ConfigDict(extra='ignore')
+    
     success: bool
     message: str
     brd_markdown: str
@@ -109,15 +185,149 @@ class BRDResponse(BaseModel):
     project_name: str
     generated_data: Dict[str, Any]
     llm_provider_used: str
-    summary: Dict[str, Any]  # This will include completeness_score, completeness_status, and intelligent_prompt
+    summary: SummaryData
 
 
 
-@router.post("/generate_brd_from_input", response_model=BRDResponse)
-async def generate_brd_from_input(
-    request: ProjectDescriptionRequest,
-    client_id: str = Depends(check_rate_limit)
-):
+def _json_response(response: BRDResponse) -> Response:
+    """Serialize a BRD response with Pydantic's native JSON encoder, skipping jsonable_encoder"""
+    return Response(content=response.model_dump_json(), media_type="application/json")
+
+def _populate_bra(brd_data: Dict[str, Any]):
+    """Create a BRA with its schema filled from LLM data; returns (bra, completeness_analysis, intelligent_prompt)"""
+    bra = BusinessRequirementAgent()
+    bra.schema = schema = BRDSchema.from_dict(brd_data)
+    if not schema.project_name or schema.project_name.isspace():
+        schema.project_name = _DEFAULT_PROJECT_NAME
+        logger.warning("⚠️ Project name was empty, using default: %s", _DEFAULT_PROJECT_NAME)
+    
+    logger.debug("✅ BRA schema populated successfully")
+    
+    # Analyze completeness and generate intelligent prompt
+    completeness_analysis = bra.get_completeness_score(brd_data)
+    intelligent_prompt = bra.get_intelligent_prompt(brd_data, completeness_analysis)
+    
+    logger.debug("✅ Completeness analysis completed: %.1f%%", completeness_analysis['completeness_percentage'])
+    return bra, completeness_analysis, intelligent_prompt
+
+_REQUIREMENT_TYPES = ('business', 'functional', 'non_functional')
+
+def _summary_counts(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Count items per BRD section from a schema dict (or vars() of a BRDSchema)"""
+    requirements = data['requirements']
+    # Keys are emitted in SummaryData field order so validation walks them in sequence
+    return {
+        'stakeholders_count': len(data['stakeholders']),
+        'objectives_count': len(data['objectives']),
+        'requirements_count': RequirementsCount(**{key: len(requirements[key]) for key in _REQUIREMENT_TYPES}),
+        'assumptions_count': len(data['assumptions']),
+        'constraints_count': len(data['constraints']),
+        'success_criteria_count': len(data['success_criteria'])
+    }
+
+def _build_summary(bra: BusinessRequirementAgent, completeness_analysis: Dict[str, Any], intelligent_prompt: str, extra_summary: Optional[Dict[str, Any]] = None) -> SummaryData:
+    """Build the response summary block from the populated BRA schema"""
+    return SummaryData(
+        **_summary_counts(vars(bra.schema)),
+        completeness_score=completeness_analysis['completeness_percentage'],
+        completeness_status='Complete' if completeness_analysis['is_complete'] else 'Needs Improvement',
+        intelligent_prompt=intelligent_prompt,
+        **(extra_summary or {})
+    )
+
+async def _assemble_response(
+    brd_data: Dict[str, Any],
+    model: Optional[str],
+    message: str,
+    provider_label: str,
+    llm_service: LLMService,
+    cache_key: Optional[str] = None,
+    extra_summary: Optional[Dict[str, Any]] = None
+) -> BRDResponse:
+    """
+    Populate the BRA schema from LLM data, render the BRD and build the API response
+    """
+    # Create BRA instance and populate with LLM data
+    try:
+        bra, completeness_analysis, intelligent_prompt = _populate_bra(brd_data)
+    except Exception as e:
+        logger.exception("❌ BRA schema population failed: %s", e)
+        raise HTTPException(status_code=500, detail=f'Failed to populate BRA schema: {str(e)}')
+    
+    # Generate BRD content
+    try:
+        brd_content = await asyncio.to_thread(bra.generate_brd_markdown, llm_service)
+        
+        # Debug: Show the actual schema data
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🔍 Schema data before JSON conversion:")
+            logger.debug("   - project_name: %s", bra.schema.project_name)
+            logger.debug("   - stakeholders: %s", bra.schema.stakeholders)
+            logger.debug("   - objectives: %s", bra.schema.objectives)
+            logger.debug("   - scope: %s", bra.schema.scope)
+            logger.debug("   - requirements: %s", bra.schema.requirements)
+            logger.debug("   - assumptions: %s", bra.schema.assumptions)
+            logger.debug("   - constraints: %s", bra.schema.constraints)
+            logger.debug("   - success_criteria: %s", bra.schema.success_criteria)
+        
+        schema_json = bra.export_schema_dict()
+        
+        logger.debug("✅ BRD content generated successfully")
+    except Exception as e:
+        logger.exception("❌ BRD content generation failed: %s", e)
+        raise HTTPException(status_code=500, detail=f'Failed to generate BRD content: {str(e)}')
+    
+    # Create and return response
+    try:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🔍 Creating BRDResponse with data:")
+            logger.debug("   - success: True")
+            logger.debug("   - message: %r", message)
+            logger.debug("   - brd_markdown length: %s", len(brd_content))
+            logger.debug("   - schema_json type: %s", type(schema_json))
+            logger.debug("   - project_name: %s", bra.schema.project_name)
+            logger.debug("   - generated_data keys: %s", list(brd_data.keys()))
+            logger.debug("   - llm_provider_used: %s", model or 'default')
+            logger.debug("   - summary data: %s stakeholders, %s objectives", len(bra.schema.stakeholders), len(bra.schema.objectives))
+            if extra_summary:
+                logger.debug("   - extra summary: %s", extra_summary)
+        
+        # Validate that all required data is present
+        if not brd_content or brd_content.isspace():
+            raise ValueError("BRD content is empty")
+        
+        # Counting every section doubles as the schema shape check: a missing or
+        # non-list section raises KeyError/TypeError here
+        summary_data = _build_summary(bra, completeness_analysis, intelligent_prompt, extra_summary)
+        
+        logger.debug("✅ Summary data validated successfully")
+        
+        # Data was shape-checked above; skip re-validating the nested dicts
+        response = BRDResponse.model_construct(
+            success=True,
+            message=message,
+            brd_markdown=brd_content,
+            brd_schema=schema_json,
+            project_name=bra.schema.project_name,
+            generated_data=brd_data,
+            llm_provider_used=provider_label,
+            summary=summary_data
+        )
+        logger.debug("✅ Response created successfully")
+        
+        # Only cache results good enough to reuse (not empty fallback structures)
+        if cache_key and completeness_analysis['is_complete']:
+            brd_cache.set(cache_key, response)
+        return response
+    except (KeyError, TypeError) as e:
+        logger.exception("❌ Malformed BRD schema (%s): %s", type(e).__name__, e)
+        raise HTTPException(status_code=422, detail=f'Malformed BRD schema: {str(e)}')
+    except Exception as e:
+        logger.exception("❌ Response creation failed (%s): %s", type(e).__name__, e)
+        raise HTTPException(status_code=500, detail=f'Failed to create response: {str(e)}')
+
+
+async def _generate_brd_from_input(request: ProjectDescriptionRequest, llm_service: LLMService) -> BRDResponse:
     """
     Generate BRD from user's natural language input using LLM
     """
@@ -131,210 +341,63 @@ async def generate_brd_from_input(
         project_description = request.project_description
         model = request.model
         
-        # Use LLM service to generate BRD data
+        # Serve repeated requests for the same input from the response cache
+        # The endpoint tag keeps these entries apart from /generate_brd_with_files responses
+        cache_key = brd_cache.cache_key(model, project_description, "input")
+        cached_response = brd_cache.get(cache_key)
+        if cached_response is not None:
+            logger.debug("✅ Returning cached BRD response")
+            return cached_response
+        
+        # Use LLM service to generate BRD data (async Gemini client, no worker thread needed)
         try:
-            brd_data = llm_service.generate_brd_from_input(project_description, model)
-            print(f"✅ LLM service returned data: {len(brd_data)} keys")
+            brd_data = await llm_service.agenerate_brd_from_input(project_description, model)
+            logger.debug("✅ LLM service returned data: %s keys", len(brd_data))
             
             # Validate the returned data structure
-            required_keys = ['project_name', 'stakeholders', 'objectives', 'scope', 'requirements', 'assumptions', 'constraints', 'success_criteria']
-            missing_keys = [key for key in required_keys if key not in brd_data]
+            missing_keys = apply_brd_defaults(brd_data)
             if missing_keys:
-                print(f"⚠️ Missing required keys: {missing_keys}")
-                # Add default values for missing keys
-                for key in missing_keys:
-                    if key == 'scope':
-                        brd_data[key] = {'in_scope': [], 'out_scope': []}
-                    elif key == 'requirements':
-                        brd_data[key] = {'business': [], 'functional': [], 'non_functional': []}
-                    else:
-                        brd_data[key] = []
-                print(f"✅ Added default values for missing keys")
+                logger.warning("⚠️ Missing required keys, added defaults: %s", missing_keys)
             
         except Exception as e:
-            print(f"❌ LLM service failed: {e}")
+            logger.exception("❌ LLM service failed: %s", e)
             raise HTTPException(status_code=500, detail=f'LLM service failed: {str(e)}')
         
-        # Create BRA instance and populate with LLM data
-        try:
-            bra = BusinessRequirementAgent()
-            bra.schema.project_name = brd_data.get('project_name', 'Project')
-            if not bra.schema.project_name or not bra.schema.project_name.strip():
-                bra.schema.project_name = "Project"
-                print(f"⚠️ Project name was empty, using default: {bra.schema.project_name}")
-            bra.schema.stakeholders = brd_data.get('stakeholders', [])
-            bra.schema.objectives = brd_data.get('objectives', [])
-            
-            # Handle nested scope structure
-            scope_data = brd_data.get('scope', {})
-            if isinstance(scope_data, dict):
-                bra.schema.scope["in_scope"] = scope_data.get('in_scope', [])
-                bra.schema.scope["out_scope"] = scope_data.get('out_scope', [])
-            else:
-                bra.schema.scope["in_scope"] = []
-                bra.schema.scope["out_scope"] = []
-            
-            # Handle nested requirements structure
-            requirements_data = brd_data.get('requirements', {})
-            if isinstance(requirements_data, dict):
-                bra.schema.requirements["business"] = requirements_data.get('business', [])
-                bra.schema.requirements["functional"] = requirements_data.get('functional', [])
-                bra.schema.requirements["non_functional"] = requirements_data.get('non_functional', [])
-            else:
-                bra.schema.requirements["business"] = []
-                bra.schema.requirements["functional"] = []
-                bra.schema.requirements["non_functional"] = []
-            
-            bra.schema.assumptions = brd_data.get('assumptions', [])
-            bra.schema.constraints = brd_data.get('constraints', [])
-            bra.schema.success_criteria = brd_data.get('success_criteria', [])
-            
-            print(f"✅ BRA schema populated successfully")
-            
-            # Analyze completeness and generate intelligent prompt
-            completeness_analysis = bra.get_completeness_score(brd_data)
-            intelligent_prompt = bra.get_intelligent_prompt(brd_data)
-            
-            print(f"✅ Completeness analysis completed: {completeness_analysis['completeness_percentage']:.1f}%")
-            
-        except Exception as e:
-            print(f"❌ BRA schema population failed: {e}")
-            raise HTTPException(status_code=500, detail=f'Failed to populate BRA schema: {str(e)}')
-        
-        # Initialize BRA for intelligent analysis
-        try:
-            print(f"✅ BRA initialized for intelligent analysis")
-        except Exception as e:
-            print(f"❌ BRA initialization failed: {e}")
-            raise HTTPException(status_code=500, detail=f'Failed to initialize BRA: {str(e)}')
-        
-        # Generate BRD content
-        try:
-            brd_content = bra.generate_brd_markdown(llm_service)
-            
-            # Debug: Show the actual schema data
-            print(f"🔍 Schema data before JSON conversion:")
-            print(f"   - project_name: {bra.schema.project_name}")
-            print(f"   - stakeholders: {bra.schema.stakeholders}")
-            print(f"   - objectives: {bra.schema.objectives}")
-            print(f"   - scope: {bra.schema.scope}")
-            print(f"   - requirements: {bra.schema.requirements}")
-            print(f"   - assumptions: {bra.schema.assumptions}")
-            print(f"   - constraints: {bra.schema.constraints}")
-            print(f"   - success_criteria: {bra.schema.success_criteria}")
-            
-            schema_json_string = bra.export_schema_json()
-            print(f"🔍 JSON string length: {len(schema_json_string)}")
-            print(f"🔍 JSON string preview: {schema_json_string[:200]}...")
-            
-            # Parse the JSON string back to a dictionary
-            import json
-            try:
-                schema_json = json.loads(schema_json_string)
-                print(f"✅ Schema JSON parsed successfully: {len(schema_json)} keys")
-            except json.JSONDecodeError as json_error:
-                print(f"❌ Failed to parse schema JSON: {json_error}")
-                # Create a fallback schema if parsing fails
-                schema_json = {
-                    "project_name": bra.schema.project_name,
-                    "stakeholders": bra.schema.stakeholders,
-                    "objectives": bra.schema.objectives,
-                    "scope": bra.schema.scope,
-                    "requirements": bra.schema.requirements,
-                    "assumptions": bra.schema.assumptions,
-                    "constraints": bra.schema.constraints,
-                    "success_criteria": bra.schema.success_criteria
-                }
-                print(f"✅ Using fallback schema structure")
-            
-            print(f"✅ BRD content generated successfully")
-        except Exception as e:
-            print(f"❌ BRD content generation failed: {e}")
-            raise HTTPException(status_code=500, detail=f'Failed to generate BRD content: {str(e)}')
-        
-
-        
-        # Create and return response
-        try:
-            print(f"🔍 Creating BRDResponse with data:")
-            print(f"   - success: True")
-            print(f"   - message: 'BRD generated successfully from your input!'")
-            print(f"   - brd_markdown length: {len(brd_content)}")
-            print(f"   - schema_json type: {type(schema_json)}")
-            print(f"   - project_name: {bra.schema.project_name}")
-            print(f"   - generated_data keys: {list(brd_data.keys())}")
-            print(f"   - llm_provider_used: {model or 'default'}")
-            print(f"   - summary data: {len(bra.schema.stakeholders)} stakeholders, {len(bra.schema.objectives)} objectives")
-            
-            # Validate that all required data is present
-            if not brd_content or len(brd_content.strip()) == 0:
-                raise ValueError("BRD content is empty")
-            
-            if not schema_json or not isinstance(schema_json, dict):
-                raise ValueError(f"Schema JSON is invalid: {type(schema_json)}")
-            
-            if not bra.schema.project_name or not bra.schema.project_name.strip():
-                # Set a default project name if missing
-                bra.schema.project_name = "Project"
-                print(f"⚠️ Project name was missing, using default: {bra.schema.project_name}")
-            
-            # Ensure all summary fields are present and valid
-            summary_data = {
-                'stakeholders_count': len(bra.schema.stakeholders),
-                'objectives_count': len(bra.schema.objectives),
-                'requirements_count': {
-                    'business': len(bra.schema.requirements['business']),
-                    'functional': len(bra.schema.requirements['functional']),
-                    'non_functional': len(bra.schema.requirements['non_functional'])
-                },
-                'assumptions_count': len(bra.schema.assumptions),
-                'constraints_count': len(bra.schema.constraints),
-                'success_criteria_count': len(bra.schema.success_criteria),
-                'completeness_score': completeness_analysis['completeness_percentage'],
-                'completeness_status': 'Complete' if completeness_analysis['is_complete'] else 'Needs Improvement',
-                'intelligent_prompt': intelligent_prompt
-            }
-            
-            print(f"✅ Summary data validated successfully")
-            
-            response = BRDResponse(
-                success=True,
-                message='BRD generated successfully from your input!',
-                brd_markdown=brd_content,
-                brd_schema=schema_json,
-                project_name=bra.schema.project_name,
-                generated_data=brd_data,
-                llm_provider_used='Google Gemini',
-                summary=summary_data
-            )
-            print(f"✅ Response created successfully")
-            return response
-        except Exception as e:
-            print(f"❌ Response creation failed: {e}")
-            print(f"❌ Response error type: {type(e).__name__}")
-            import traceback
-            traceback.print_exc()
-            raise HTTPException(status_code=500, detail=f'Failed to create response: {str(e)}')
+        return await _assemble_response(
+            brd_data,
+            model,
+            'BRD generated successfully from your input!',
+            'Google Gemini',
+            llm_service,
+            cache_key=cache_key
+        )
         
+    except HTTPException:
+        # Already mapped to a status code (and logged) where it was raised
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (KeyError, TypeError) as e:
+        logger.exception("❌ Malformed BRD data in generate_brd_from_input: %s", e)
+        raise HTTPException(status_code=422, detail=f'Malformed BRD data: {str(e)}')
     except Exception as e:
-        import traceback
-        print(f"❌ Error in generate_brd_from_input: {str(e)}")
-        print(f"❌ Error type: {type(e).__name__}")
-        print(f"❌ Full traceback:")
-        traceback.print_exc()
+        logger.exception("❌ Error in generate_brd_from_input (%s): %s", type(e).__name__, e)
         raise HTTPException(status_code=500, detail=f'Error generating BRD: {str(e)}')
 
 
+@router.post("/generate_brd_from_input", response_model=BRDResponse)
+async def generate_brd_from_input(
+    request: ProjectDescriptionRequest,
+    client_id: str = Depends(check_rate_limit),
+    llm_service: LLMService = Depends(get_llm_service)
+):
+    """
+    Generate BRD from user's natural language input using LLM
+    """
+    return _json_response(await _generate_brd_from_input(request, llm_service))
 
 
-
-
-
-@router.post("/generate_brd_with_files", response_model=BRDResponse)
-async def generate_brd_with_files(
-    request: ProjectDescriptionWithFilesRequest,
-    client_id: str = Depends(check_rate_limit)
-):
+async def _generate_brd_with_files(request: ProjectDescriptionWithFilesRequest, llm_service: LLMService) -> BRDResponse:
     """
     Generate BRD from user's natural language input and uploaded files using LLM
     """
@@ -347,41 +410,34 @@ async def generate_brd_with_files(
         
         project_description = request.project_description
         uploaded_files = request.uploaded_files
+        files_count = len(uploaded_files)
         model = request.model
         
-        # Additional validation for uploaded files
-        if uploaded_files:
-            total_content_length = sum(len(file.content) for file in uploaded_files)
-            if total_content_length > 100000:  # 100KB total limit
-                raise HTTPException(
-                    status_code=400, 
-                    detail="Total file content size exceeds 100KB limit. Please reduce file sizes or content."
-                )
-            
-            # Validate file types
-            valid_types = [
-                'application/pdf', 
-                'text/markdown', 
-                'text/x-markdown', 
-                'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-            ]
-            invalid_files = [f for f in uploaded_files if f.type not in valid_types]
-            if invalid_files:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid file types detected: {[f.filename for f in invalid_files]}. Only PDF, MD, and DOCX files are supported."
-                )
+        # Validate uploaded files and detect existing BRDs in a single pass
+        total_content_length = 0
+        invalid_files = []
+        has_existing_brd = False
+        for f in uploaded_files:
+            total_content_length += len(f.content)
+            if f.type not in Config.VALID_FILE_TYPES:
+                invalid_files.append(f.filename)
+            if not has_existing_brd and _EXISTING_BRD_RE.search(f.filename):
+                has_existing_brd = True
         
-        # Check if user uploaded existing BRD documents
-        has_existing_brd = any(
-            'brd' in f.filename.lower() or 
-            'business requirements' in f.filename.lower() or 
-            'requirements document' in f.filename.lower()
-            for f in uploaded_files
-        )
+        if total_content_length > 100000:  # 100KB total limit
+            raise HTTPException(
+                status_code=400, 
+                detail="Total file content size exceeds 100KB limit. Please reduce file sizes or content."
+            )
+        
+        if invalid_files:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid file types detected: {invalid_files}. Only PDF, MD, and DOCX files are supported."
+            )
         
         if has_existing_brd:
-            print(f"🔍 Detected existing BRD documents - using improvement mode")
+            logger.debug("🔍 Detected existing BRD documents - using improvement mode")
             # Use the BRD improvement logic for existing documents
             try:
                 # Combine all BRD content
@@ -389,27 +445,37 @@ async def generate_brd_with_files(
                 
                 # Use BRA to analyze and improve the existing BRD
                 bra = BusinessRequirementAgent()
-                analysis_result = bra.analyze_existing_brd(brd_content)
-                
-                if 'error' in analysis_result:
-                    print(f"❌ BRD analysis failed: {analysis_result['error']}")
-                    raise HTTPException(status_code=400, detail=f'BRD analysis failed: {analysis_result["error"]}')
+                # Analysis doesn't depend on the improvement instructions, so reuse it per document
+                analysis_key = hashlib.sha256(brd_content.encode('utf-8')).hexdigest()
+                cached_analysis = brd_analysis_cache.get(analysis_key)
+                if cached_analysis is not None:
+                    # Work on a copy so this request can't alter the shared entry
+                    analysis_result = copy.deepcopy(cached_analysis)
+                else:
+                    analysis_result = await asyncio.to_thread(bra.analyze_existing_brd, brd_content)
+                    
+                    if 'error' in analysis_result:
+                        logger.error("❌ BRD analysis failed: %s", analysis_result['error'])
+                        raise HTTPException(status_code=400, detail=f'BRD analysis failed: {analysis_result["error"]}')
+                    
+                    brd_analysis_cache.set(analysis_key, copy.deepcopy(analysis_result))
                 
-                print(f"✅ BRD analysis completed successfully")
+                logger.debug("✅ BRD analysis completed successfully")
                 
-                # Improve the BRD using AI
-                improvement_result = bra.improve_existing_brd(
+                # Improve the BRD using AI, reusing the analysis above instead of re-parsing the document
+                improvement_result = await bra.aimprove_existing_brd(
                     brd_content,
                     project_description or "Improve the existing BRD document",
-                    llm_service
+                    llm_service,
+                    analysis_result=analysis_result
                 )
                 
                 if not improvement_result.get('success', False):
-                    print(f"⚠️ AI improvement failed: {improvement_result.get('error', 'Unknown error')}")
+                    logger.warning("⚠️ AI improvement failed: %s", improvement_result.get('error', 'Unknown error'))
                     improved_content = brd_content
                     improvement_notes = improvement_result.get('improvement_notes', ['AI improvement not available'])
                 else:
-                    print(f"✅ AI improvement completed successfully")
+                    logger.debug("✅ AI improvement completed successfully")
                     improved_content = improvement_result.get('improved_content', brd_content)
                     improvement_notes = improvement_result.get('improvement_notes', [])
                 
@@ -431,27 +497,19 @@ async def generate_brd_with_files(
                 completeness_analysis = bra.get_completeness_score(enhanced_schema)
                 
                 # Create summary data
-                summary_data = {
-                    'stakeholders_count': len(enhanced_schema['stakeholders']),
-                    'objectives_count': len(enhanced_schema['objectives']),
-                    'requirements_count': {
-                        'business': len(enhanced_schema['requirements']['business']),
-                        'functional': len(enhanced_schema['requirements']['functional']),
-                        'non_functional': len(enhanced_schema['requirements']['non_functional'])
-                    },
-                    'assumptions_count': len(enhanced_schema['assumptions']),
-                    'constraints_count': len(enhanced_schema['constraints']),
-                    'success_criteria_count': len(enhanced_schema['success_criteria']),
-                    'completeness_score': completeness_analysis['completeness_percentage'],
-                    'completeness_status': 'Complete' if completeness_analysis['is_complete'] else 'Needs Improvement',
-                    'analysis_items_found': len(enhanced_schema['analysis_notes']),
-                    'improvement_items_applied': len(enhanced_schema['improvement_notes']),
-                    'original_content_length': len(brd_content),
-                    'improved_content_length': len(improved_content),
-                    'improvement_instructions_provided': bool(project_description)
-                }
+                summary_data = SummaryData(
+                    **_summary_counts(enhanced_schema),
+                    completeness_score=completeness_analysis['completeness_percentage'],
+                    completeness_status='Complete' if completeness_analysis['is_complete'] else 'Needs Improvement',
+                    analysis_items_found=len(enhanced_schema['analysis_notes']),
+                    improvement_items_applied=len(enhanced_schema['improvement_notes']),
+                    original_content_length=len(brd_content),
+                    improved_content_length=len(improved_content),
+                    improvement_instructions_provided=bool(project_description)
+                )
                 
-                response = BRDResponse(
+                # Data was shape-checked above; skip re-validating the nested dicts
+                response = BRDResponse.model_construct(
                     success=True,
                     message='BRD analyzed and improved successfully!',
                     brd_markdown=improved_content,
@@ -462,237 +520,219 @@ async def generate_brd_with_files(
                     summary=summary_data
                 )
                 
-                print(f"✅ BRD improvement completed successfully")
+                logger.debug("✅ BRD improvement completed successfully")
                 return response
                 
+            except HTTPException:
+                raise
             except Exception as e:
-                print(f"❌ BRD improvement failed: {e}")
+                logger.exception("❌ BRD improvement failed: %s", e)
                 raise HTTPException(status_code=500, detail=f'BRD improvement failed: {str(e)}')
         
         # Standard BRD generation mode
+        # Serve repeated requests for the same input and files from the response cache
+        cache_key = brd_cache.cache_key(
+            model,
+            project_description,
+            "files",
+            *(f"{f.filename}\0{f.type}\0{f.content}" for f in uploaded_files)
+        )
+        cached_response = brd_cache.get(cache_key)
+        if cached_response is not None:
+            logger.debug("✅ Returning cached BRD response")
+            return cached_response
+        
         # Combine project description with file contents for enhanced context
         enhanced_description = project_description
         
         if uploaded_files:
-            file_context = "\n\nAdditional context from uploaded files:\n"
+            file_context = ["\n\nAdditional context from uploaded files:\n"]
             for file_obj in uploaded_files:
-                file_context += f"\n--- {file_obj.filename} ({file_obj.type}) ---\n"
+                file_context.append(f"\n--- {file_obj.filename} ({file_obj.type}) ---\n")
                 # Limit each file's content contribution to prevent token overflow
-                content_preview = file_obj.content[:2000] + ("..." if len(file_obj.content) > 2000 else "")
-                file_context += content_preview
-                file_context += "\n"
+                content = file_obj.content
+                file_context.append(content if len(content) <= 2000 else content[:2000] + "...")
+                file_context.append("\n")
             
-            enhanced_description += file_context
+            enhanced_description += "".join(file_context)
         
-        print(f"📄 Processing request with {len(uploaded_files)} files")
-        print(f"📝 Enhanced description length: {len(enhanced_description)} characters")
+        logger.debug("📄 Processing request with %s files", files_count)
+        logger.debug("📝 Enhanced description length: %s characters", len(enhanced_description))
         
-        # Use LLM service to generate BRD data
+        # Use LLM service to generate BRD data (async Gemini client, no worker thread needed)
         try:
-            brd_data = llm_service.generate_brd_from_input(enhanced_description, model)
-            print(f"✅ LLM service returned data: {len(brd_data)} keys")
+            brd_data = await llm_service.agenerate_brd_from_input(enhanced_description, model)
+            logger.debug("✅ LLM service returned data: %s keys", len(brd_data))
             
             # Validate the returned data structure
-            required_keys = ['project_name', 'stakeholders', 'objectives', 'scope', 'requirements', 'assumptions', 'constraints', 'success_criteria']
-            missing_keys = [key for key in required_keys if key not in brd_data]
+            missing_keys = apply_brd_defaults(brd_data)
             if missing_keys:
-                print(f"⚠️ Missing required keys: {missing_keys}")
-                # Add default values for missing keys
-                for key in missing_keys:
-                    if key == 'scope':
-                        brd_data[key] = {'in_scope': [], 'out_scope': []}
-                    elif key == 'requirements':
-                        brd_data[key] = {'business': [], 'functional': [], 'non_functional': []}
-                    else:
-                        brd_data[key] = []
-                print(f"✅ Added default values for missing keys")
+                logger.warning("⚠️ Missing required keys, added defaults: %s", missing_keys)
             
         except Exception as e:
-            print(f"❌ LLM service failed: {e}")
+            logger.exception("❌ LLM service failed: %s", e)
             raise HTTPException(status_code=500, detail=f'LLM service failed: {str(e)}')
         
-        # Create BRA instance and populate with LLM data
-        try:
-            bra = BusinessRequirementAgent()
-            bra.schema.project_name = brd_data.get('project_name', 'Project')
-            if not bra.schema.project_name or not bra.schema.project_name.strip():
-                bra.schema.project_name = "Project"
-                print(f"⚠️ Project name was empty, using default: {bra.schema.project_name}")
-            bra.schema.stakeholders = brd_data.get('stakeholders', [])
-            bra.schema.objectives = brd_data.get('objectives', [])
-            
-            # Handle nested scope structure
-            scope_data = brd_data.get('scope', {})
-            if isinstance(scope_data, dict):
-                bra.schema.scope["in_scope"] = scope_data.get('in_scope', [])
-                bra.schema.scope["out_scope"] = scope_data.get('out_scope', [])
-            else:
-                bra.schema.scope["in_scope"] = []
-                bra.schema.scope["out_scope"] = []
-            
-            # Handle nested requirements structure
-            requirements_data = brd_data.get('requirements', {})
-            if isinstance(requirements_data, dict):
-                bra.schema.requirements["business"] = requirements_data.get('business', [])
-                bra.schema.requirements["functional"] = requirements_data.get('functional', [])
-                bra.schema.requirements["non_functional"] = requirements_data.get('non_functional', [])
-            else:
-                bra.schema.requirements["business"] = []
-                bra.schema.requirements["functional"] = []
-                bra.schema.requirements["non_functional"] = []
-            
-            bra.schema.assumptions = brd_data.get('assumptions', [])
-            bra.schema.constraints = brd_data.get('constraints', [])
-            bra.schema.success_criteria = brd_data.get('success_criteria', [])
-            
-            print(f"✅ BRA schema populated successfully")
-            
-            # Analyze completeness and generate intelligent prompt
-            completeness_analysis = bra.get_completeness_score(brd_data)
-            intelligent_prompt = bra.get_intelligent_prompt(brd_data)
-            
-            print(f"✅ Completeness analysis completed: {completeness_analysis['completeness_percentage']:.1f}%")
-            
-        except Exception as e:
-            print(f"❌ BRA schema population failed: {e}")
-            raise HTTPException(status_code=500, detail=f'Failed to populate BRA schema: {str(e)}')
-        
-        # Initialize BRA for intelligent analysis
-        try:
-            print(f"✅ BRA initialized for intelligent analysis")
-        except Exception as e:
-            print(f"❌ BRA initialization failed: {e}")
-            raise HTTPException(status_code=500, detail=f'Failed to initialize BRA: {str(e)}')
-        
-        # Generate BRD content
-        try:
-            brd_content = bra.generate_brd_markdown(llm_service)
-            
-            # Debug: Show the actual schema data
-            print(f"🔍 Schema data before JSON conversion:")
-            print(f"   - project_name: {bra.schema.project_name}")
-            print(f"   - stakeholders: {bra.schema.stakeholders}")
-            print(f"   - objectives: {bra.schema.objectives}")
-            print(f"   - scope: {bra.schema.scope}")
-            print(f"   - requirements: {bra.schema.requirements}")
-            print(f"   - assumptions: {bra.schema.assumptions}")
-            print(f"   - constraints: {bra.schema.constraints}")
-            print(f"   - success_criteria: {bra.schema.success_criteria}")
-            
-            schema_json_string = bra.export_schema_json()
-            print(f"🔍 JSON string length: {len(schema_json_string)}")
-            print(f"🔍 JSON string preview: {schema_json_string[:200]}...")
-            
-            # Parse the JSON string back to a dictionary
-            import json
-            try:
-                schema_json = json.loads(schema_json_string)
-                print(f"✅ Schema JSON parsed successfully: {len(schema_json)} keys")
-            except json.JSONDecodeError as json_error:
-                print(f"❌ Failed to parse schema JSON: {json_error}")
-                # Create a fallback schema if parsing fails
-                schema_json = {
-                    "project_name": bra.schema.project_name,
-                    "stakeholders": bra.schema.stakeholders,
-                    "objectives": bra.schema.objectives,
-                    "scope": bra.schema.scope,
-                    "requirements": bra.schema.requirements,
-                    "assumptions": bra.schema.assumptions,
-                    "constraints": bra.schema.constraints,
-                    "success_criteria": bra.schema.success_criteria
-                }
-                print(f"✅ Using fallback schema structure")
-            
-            print(f"✅ BRD content generated successfully")
-        except Exception as e:
-            print(f"❌ BRD content generation failed: {e}")
-            raise HTTPException(status_code=500, detail=f'Failed to generate BRD content: {str(e)}')
-        
-        # Create and return response
-        try:
-            print(f"🔍 Creating BRDResponse with data:")
-            print(f"   - success: True")
-            print(f"   - message: 'BRD generated successfully from your input and uploaded files!'")
-            print(f"   - brd_markdown length: {len(brd_content)}")
-            print(f"   - schema_json type: {type(schema_json)}")
-            print(f"   - project_name: {bra.schema.project_name}")
-            print(f"   - generated_data keys: {list(brd_data.keys())}")
-            print(f"   - llm_provider_used: {model or 'default'}")
-            print(f"   - summary data: {len(bra.schema.stakeholders)} stakeholders, {len(bra.schema.objectives)} objectives")
-            print(f"   - files processed: {len(uploaded_files)}")
-            
-            # Validate that all required data is present
-            if not brd_content or len(brd_content.strip()) == 0:
-                raise ValueError("BRD content is empty")
-            
-            if not schema_json or not isinstance(schema_json, dict):
-                raise ValueError(f"Schema JSON is invalid: {type(schema_json)}")
-            
-            if not bra.schema.project_name or not bra.schema.project_name.strip():
-                # Set a default project name if missing
-                bra.schema.project_name = "Project"
-                print(f"⚠️ Project name was missing, using default: {bra.schema.project_name}")
-            
-            # Ensure all summary fields are present and valid
-            summary_data = {
-                'stakeholders_count': len(bra.schema.stakeholders),
-                'objectives_count': len(bra.schema.objectives),
-                'requirements_count': {
-                    'business': len(bra.schema.requirements['business']),
-                    'functional': len(bra.schema.requirements['functional']),
-                    'non_functional': len(bra.schema.requirements['non_functional'])
-                },
-                'assumptions_count': len(bra.schema.assumptions),
-                'constraints_count': len(bra.schema.constraints),
-                'success_criteria_count': len(bra.schema.success_criteria),
-                'completeness_score': completeness_analysis['completeness_percentage'],
-                'completeness_status': 'Complete' if completeness_analysis['is_complete'] else 'Needs Improvement',
-                'intelligent_prompt': intelligent_prompt,
-                'files_processed': len(uploaded_files)
-            }
-            
-            print(f"✅ Summary data validated successfully")
-            
-            response = BRDResponse(
-                success=True,
-                message='BRD generated successfully from your input and uploaded files!',
-                brd_markdown=brd_content,
-                brd_schema=schema_json,
-                project_name=bra.schema.project_name,
-                generated_data=brd_data,
-                llm_provider_used='Google Gemini',
-                summary=summary_data
-            )
-            print(f"✅ Response created successfully")
-            return response
-        except Exception as e:
-            print(f"❌ Response creation failed: {e}")
-            print(f"❌ Response error type: {type(e).__name__}")
-            import traceback
-            traceback.print_exc()
-            raise HTTPException(status_code=500, detail=f'Failed to create response: {str(e)}')
+        return await _assemble_response(
+            brd_data,
+            model,
+            'BRD generated successfully from your input and uploaded files!',
+            'Google Gemini',
+            llm_service,
+            cache_key=cache_key,
+            extra_summary={'files_processed': files_count}
+        )
         
+    except HTTPException:
+        # Already mapped to a status code (and logged) where it was raised
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (KeyError, TypeError) as e:
+        logger.exception("❌ Malformed BRD data in generate_brd_with_files: %s", e)
+        raise HTTPException(status_code=422, detail=f'Malformed BRD data: {str(e)}')
     except Exception as e:
-        import traceback
-        print(f"❌ Error in generate_brd_with_files: {str(e)}")
-        print(f"❌ Error type: {type(e).__name__}")
-        print(f"❌ Full traceback:")
-        traceback.print_exc()
+        logger.exception("❌ Error in generate_brd_with_files (%s): %s", type(e).__name__, e)
         raise HTTPException(status_code=500, detail=f'Error generating BRD: {str(e)}')
 
 
+@router.post("/generate_brd_with_files", response_model=BRDResponse)
+async def generate_brd_with_files(
+    request: ProjectDescriptionWithFilesRequest,
+    client_id: str = Depends(check_rate_limit),
+    llm_service: LLMService = Depends(get_llm_service)
+):
+    """
+    Generate BRD from user's natural language input and uploaded files using LLM
+    """
+    return _json_response(await _generate_brd_with_files(request, llm_service))
 
+# Shared encoder: json.dumps() with non-default options builds a new encoder on every call
+_NDJSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
 
+def _ndjson_line(payload: Dict[str, Any]) -> bytes:
+    """Encode one NDJSON record"""
+    return (_NDJSON_ENCODER.encode(payload) + "\n").encode("utf-8")
 
+@router.post("/generate_brd_stream")
+async def generate_brd_stream(
+    request: ProjectDescriptionRequest,
+    client_id: str = Depends(check_rate_limit),
+    llm_service: LLMService = Depends(get_llm_service)
+):
+    """
+    Generate BRD from user input and stream it as NDJSON.
+    Emits one {"type": "section"} line per markdown section as it is ready,
+    then a final {"type": "complete"} line with the schema and summary.
+    """
+    try:
+        request.validate_project_description()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        brd_data = await llm_service.agenerate_brd_from_input(request.project_description, request.model)
+        missing_keys = apply_brd_defaults(brd_data)
+        if missing_keys:
+            logger.warning("⚠️ Missing required keys, added defaults: %s", missing_keys)
+        bra, completeness_analysis, intelligent_prompt = _populate_bra(brd_data)
+    except Exception as e:
+        logger.exception("❌ LLM service failed: %s", e)
+        raise HTTPException(status_code=500, detail=f'LLM service failed: {str(e)}')
+    
+    async def stream_sections():
+        try:
+            # Advance the blocking section generator in a worker thread, one section at a time
+            sections = bra.iter_brd_sections(llm_service)
+            while True:
+                section = await asyncio.to_thread(next, sections, None)
+                if section is None:
+                    break
+                name, content = section
+                yield _ndjson_line({"type": "section", "name": name, "content": content})
+            
+            yield _ndjson_line({
+                "type": "complete",
+                "project_name": bra.schema.project_name,
+                "brd_schema": bra.export_schema_dict(),
+                "generated_data": brd_data,
+                "llm_provider_used": "Google Gemini",
+                "summary": _build_summary(bra, completeness_analysis, intelligent_prompt).model_dump()
+            })
+        except Exception as e:
+            logger.exception("❌ BRD streaming failed: %s", e)
+            yield _ndjson_line({"type": "error", "detail": f'Failed to generate BRD content: {str(e)}'})
+    
+    return StreamingResponse(stream_sections(), media_type="application/x-ndjson")
 
+@router.post("/generate_brd_from_input_async")
+async def generate_brd_from_input_async(
+    request: ProjectDescriptionRequest,
+    client_id: str = Depends(check_rate_limit),
+    llm_service: LLMService = Depends(get_llm_service)
+):
+    """
+    Queue BRD generation from user input and return a task id to poll
+    """
+    # Reject invalid input up front rather than queueing a job that can only fail
+    try:
+        request.validate_project_description()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    task_id = brd_jobs.submit(_generate_brd_from_input(request, llm_service))
+    return {"task_id": task_id, "status": "pending", "status_url": f"/api/brd_status/{task_id}"}
 
+@router.post("/generate_brd_with_files_async")
+async def generate_brd_with_files_async(
+    request: ProjectDescriptionWithFilesRequest,
+    client_id: str = Depends(check_rate_limit),
+    llm_service: LLMService = Depends(get_llm_service)
+):
+    """
+    Queue BRD generation from user input and uploaded files and return a task id to poll
+    """
+    # Reject invalid input up front rather than queueing a job that can only fail
+    try:
+        request.validate_input()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    task_id = brd_jobs.submit(_generate_brd_with_files(request, llm_service))
+    return {"task_id": task_id, "status": "pending", "status_url": f"/api/brd_status/{task_id}"}
 
-
-
-
-
-
-
+@router.get("/brd_status/{task_id}")
+async def brd_status(task_id: str):
+    """
+    Get the status of a queued BRD generation, including the BRD once completed
+    """
+    job = brd_jobs.get(task_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f'Unknown task id: {task_id}')
+    
+    return {
+        "task_id": task_id,
+        "status": job['status'],
+        "result": job['result'],
+        "error": job['error'],
+        "status_code": job['status_code']
+    }
+
+_DOWNLOAD_PLACEHOLDER_PREFIX = b"# "
+_DOWNLOAD_PLACEHOLDER_SUFFIX = b"\n\nBRD content would be here..."
+
+@functools.lru_cache(maxsize=128)
+def _render_brd_download(project_name: str) -> Tuple[bytes, str]:
+    """Render download bytes and Content-Disposition header for a project, cached for repeat downloads"""
+    # This would typically fetch from database
+    # For now, return a placeholder around the encoded name
+    content = _DOWNLOAD_PLACEHOLDER_PREFIX + project_name.encode('utf-8') + _DOWNLOAD_PLACEHOLDER_SUFFIX
+    filename = f"{project_name.translate(_FILENAME_SANITIZE_TABLE)}_BRD.md"
+    if filename.isascii():
+        return content, f'attachment; filename="{filename}"'
+    # Headers are latin-1 encoded: send an ASCII fallback plus the RFC 5987 UTF-8 name
+    ascii_filename = filename.encode('ascii', 'replace').decode('ascii').replace('?', '_')
+    return content, f"attachment; filename=\"{ascii_filename}\"; filename*=utf-8''{quote(filename)}"
 
 @router.get("/download_brd/{project_name}")
 async def download_brd(project_name: str):
@@ -700,21 +740,13 @@ async def download_brd(project_name: str):
     Download BRD as Markdown file
     """
     try:
-        # This would typically fetch from database
-        # For now, return a placeholder
-        brd_content = f"# {project_name}\n\nBRD content would be here..."
-        
-        # Create temporary file
-        filename = f"{project_name.replace(' ', '_')}_BRD.md"
-        file_path = f"/tmp/{filename}"
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(brd_content)
+        # Serve straight from memory - no temp file to write or clean up
+        content, content_disposition = _render_brd_download(project_name)
         
-        return FileResponse(
-            path=file_path,
-            filename=filename,
-            media_type='text/markdown'
+        return Response(
+            content=content,
+            media_type='text/markdown; charset=utf-8',
+            headers={'Content-Disposition': content_disposition}
         )
         
     except Exception as e:
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Response cache for BRD generation
+Short-circuits repeated requests for the same (normalized) input and model
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from config import Config
+
+
+class LLMCache:
+    """Simple in-memory LRU cache with per-entry TTL"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: int = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapse whitespace so trivial spacing edits hit the same entry (case is kept, it can change the output)"""
+        return " ".join((text or "").split())
+
+    @classmethod
+    def cache_key(cls, model: Optional[str], description: str, *extra_parts: str) -> str:
+        """Build a deterministic cache key from the model, description and any extra inputs"""
+        digest = hashlib.sha256()
+        digest.update((model or "").encode("utf-8"))
+        digest.update(b"|")
+        digest.update(cls.normalize(description).encode("utf-8"))
+        for part in extra_parts:
+            digest.update(b"|")
+            digest.update(part.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        """Store value under key, evicting the least recently used entries"""
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._entries.clear()
+
+# Global BRD response cache instance
+brd_cache = LLMCache(
+    max_entries=Config.BRD_CACHE_MAX_ENTRIES,
+    ttl_seconds=Config.BRD_CACHE_TTL_SECONDS
+)
+
+# Existing-BRD analysis results, keyed by a hash of the raw document content
+brd_analysis_cache = LLMCache(
+    max_entries=Config.BRD_ANALYSIS_CACHE_MAX_ENTRIES,
+    ttl_seconds=Config.BRD_CACHE_TTL_SECONDS
+)
+
+# AI improvements of existing BRDs, keyed by instructions and a digest of the document
+brd_improvement_cache = LLMCache(
+    max_entries=Config.BRD_IMPROVEMENT_CACHE_MAX_ENTRIES,
+    ttl_seconds=Config.BRD_CACHE_TTL_SECONDS
+)
+
+# Parsed Gemini BRD data, keyed by model and normalized user input
+brd_result_cache = LLMCache(
+    max_entries=Config.BRD_RESULT_CACHE_MAX_ENTRIES,
+    ttl_seconds=Config.BRD_CACHE_TTL_SECONDS
+)
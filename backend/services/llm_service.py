@@ -4,77 +4,165 @@ LLM Service for automatic BRD generation from user input
 Integrated with Google Gemini API for direct access to Gemini models
 """
 
+import asyncio
+import copy
 import json
-import re
 import os
+import re
+import time
+import threading
+import hashlib
 import logging
 from typing import Dict, List, Any, Union, Optional
 
-from services.brd import BRDSchema
-from google import genai
+from services.brd import BRDSchema, BusinessRequirementAgent
+from services.brd_cache import brd_result_cache
 from config import Config
 
+try:
+    # orjson is an optional speedup; its JSONDecodeError subclasses json.JSONDecodeError
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Terminal states of a Gemini batch job
+_BATCH_DONE_STATES = frozenset({
+    'JOB_STATE_SUCCEEDED', 'JOB_STATE_FAILED', 'JOB_STATE_CANCELLED', 'JOB_STATE_EXPIRED'
+})
+
+# Per-request user block that follows the static system prompt, split around the user's input
+_USER_BLOCK_PREFIX = "User's Project Description:\n"
+_USER_BLOCK_SUFFIX = (
+    "\n\nBased on this project description, please generate a comprehensive BRD structure. "
+    "Analyze the description carefully and provide meaningful content for each section. "
+    "Respond with valid JSON only:"
+)
+
+# Instructions for folding several project descriptions into one call (follows the system prompt)
+_MULTI_PROJECT_PREFIX = (
+    "You will receive several independent project descriptions as a JSON array of "
+    "{\"idx\": number, \"desc\": string} objects. Generate a separate BRD for each one, "
+    "using the JSON structure above, and never mix details between projects.\n\n"
+    "Respond with valid JSON only: a JSON array with one BRD object per input, in input order.\n\n"
+    "Project descriptions:\n"
+)
+
+# BRD sections after project_name, in document order
+_BRD_SECTION_ORDER = (
+    'stakeholders', 'objectives', 'scope', 'requirements',
+    'assumptions', 'constraints', 'success_criteria'
+)
+
+# Sections holding a dict of lists, with the keys each must contain
+_NESTED_BRD_SECTIONS = {
+    'scope': ('in_scope', 'out_scope'),
+    'requirements': ('business', 'functional', 'non_functional'),
+}
+
+def _preview(text: str, limit: int) -> str:
+    """Truncate text for log output"""
+    return text if len(text) <= limit else text[:limit] + "..."
+
+# Characters that end a JSON string literal or escape the next one
+_JSON_STRING_TOKEN_RE = re.compile(r'["\\]')
+
+# Closing bracket and structural characters outside strings, per opening bracket
+_JSON_SCANNER_TOKENS = {
+    '{': ('}', re.compile(r'[{}"]')),
+    '[': (']', re.compile(r'[\[\]"]')),
+}
+
+class _JsonBlobScanner:
+    """Finds the first balanced {...} object (or [...] array) in text that may arrive in pieces"""
+    
+    def __init__(self, opener: str = '{'):
+        self._opener = opener
+        self._closer, self._token_re = _JSON_SCANNER_TOKENS[opener]
+        self._parts: List[str] = []
+        self._length = 0
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        # Characters to skip at the start of the next chunk (a backslash ended the previous one)
+        self._skip = 0
+    
+    @property
+    def text(self) -> str:
+        """All text fed so far"""
+        return "".join(self._parts)
+    
+    def feed(self, chunk: str) -> Optional[str]:
+        """Consume the next piece of text; return the object once its closing brace arrives"""
+        base = self._length
+        self._parts.append(chunk)
+        self._length += len(chunk)
+        
+        position = self._skip
+        self._skip = 0
+        if self._start < 0:
+            position = chunk.find(self._opener)
+            if position < 0:
+                return None
+            self._start = base + position
+            self._depth = 1
+            position += 1
+        
+        # Jump between significant characters with the regex engine instead of visiting each one
+        end = len(chunk)
+        while position < end:
+            if self._in_string:
+                # Brackets inside string literals don't count toward the depth
+                match = _JSON_STRING_TOKEN_RE.search(chunk, position)
+                if match is None:
+                    break
+                position = match.end()
+                if match.group() == '\\':
+                    position += 1
+                    if position > end:
+                        self._skip = position - end
+                else:
+                    self._in_string = False
+                continue
+            
+            match = self._token_re.search(chunk, position)
+            if match is None:
+                break
+            position = match.end()
+            char = match.group()
+            if char == '"':
+                self._in_string = True
+            elif char == self._opener:
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    return self.text[self._start:base + position]
+        return None
+
+def _extract_json_blob(text: str) -> Optional[str]:
+    """Return the first brace-balanced {...} object in text, or None if there isn't one"""
+    return _JsonBlobScanner().feed(text)
+
 class LLMService:
     """Service for LLM-powered BRD generation with Google Gemini integration"""
     
     def __init__(self):
-        # Load environment variables (optional, don't fail if .env is missing)
-        try:
-            from dotenv import load_dotenv
-            load_dotenv()
-        except Exception as e:
-            print(f"⚠️ Warning: Could not load .env file: {e}")
-        
-        # Google Gemini configuration
+        # Google Gemini configuration (.env is loaded once by config on import)
         self.api_key = Config.GOOGLE_API_KEY
         self.model = Config.GOOGLE_MODEL
         
         # Log the model being used (using logger instead of print)
-        logger.info(f"LLM Service Configuration - Model: {self.model}, Provider: Google Gemini")
+        logger.info("LLM Service Configuration - Model: %s, Provider: Google Gemini", self.model)
         
-        # For development/testing, allow a dummy key
-        if not self.api_key or self.api_key.startswith('your_'):
-            logger.warning("No valid Google API key found. Using fallback mode.")
-            logger.warning("   💡 Please create a .env file with GOOGLE_API_KEY=your_actual_key")
-            logger.warning("   💡 Get your key from: https://makersuite.google.com/app/apikey")
-            self.api_key = "dummy_key_for_testing"
-            self.client = None
-        else:
-            # Initialize Gemini client
-            try:
-                logger.info("🔑 Initializing Google Gemini client...")
-                self.client = genai.Client(api_key=self.api_key)
-                logger.info("LLM Service Configuration:")
-                logger.info(f"   API Key: ✅ Valid")
-                logger.info(f"   Model: {self.model}")
-                logger.info(f"   Provider: Google Gemini")
-                
-                # Test the client with a simple call (with timeout)
-                try:
-                    logger.info("   🧪 Testing Gemini client...")
-                    # For google-genai library, we need to use the correct model format
-                    # The library expects just the model name without 'models/' prefix
-                    model_name = self.model
-                    
-                    logger.info(f"   🔧 Testing with model: {model_name}")
-                    
-                    # Skip the test call during initialization to avoid hanging
-                    logger.info("   ⚠️ Skipping Gemini test call during initialization to prevent hanging")
-                    logger.info("   ✅ Gemini client initialized successfully")
-                    
-                except Exception as test_error:
-                    logger.error(f"   ❌ Gemini client test failed: {test_error}")
-                    logger.error(f"   💡 This might indicate an API key issue or model availability")
-                    self.client = None
-                    
-            except Exception as e:
-                logger.warning(f"Failed to initialize Gemini client: {e}")
-                logger.warning(f"   💡 Check your API key and internet connection")
-                self.client = None
+        # The Gemini client is created on first use (see the client property) to keep startup light
+        self._client = None
+        self._client_initialized = False
+        self._client_lock = threading.Lock()
         
         # Dynamic system prompt for pure AI generation
         self.system_prompt = """You are an expert Business Analyst with 15+ years of experience in creating comprehensive Business Requirements Documents (BRD).
@@ -122,6 +210,68 @@ JSON Structure (respond ONLY with this):
 }
 
 CRITICAL: You MUST generate meaningful content for each section based on the project description. Do not leave sections empty - use your business analysis expertise to fill them with relevant information."""
+        
+        # Explicit Gemini caches for the static system prompt, keyed by (model, prompt hash)
+        # Everything before the user's input is constant, so build it once
+        self._prompt_prefix = f"{self.system_prompt}\n\n{_USER_BLOCK_PREFIX}"
+        self._system_prompt_hash = hashlib.sha256(self.system_prompt.encode("utf-8")).hexdigest()[:16]
+        self._prompt_caches: Dict[tuple, tuple] = {}
+        self._prompt_cache_lock = threading.Lock()
+        
+        # Caps in-flight async Gemini calls to stay within the account's QPM tier
+        self._gemini_semaphore = asyncio.Semaphore(Config.GEMINI_MAX_CONCURRENCY)
+    
+    @property
+    def client(self):
+        """Gemini client, created on first access; None when no usable API key is configured"""
+        if not self._client_initialized:
+            with self._client_lock:
+                if not self._client_initialized:
+                    self._client = self._create_client()
+                    self._client_initialized = True
+        return self._client
+    
+    def _create_client(self):
+        """Build the Gemini client (SDK imported here so importing this module stays cheap)"""
+        # For development/testing, allow a dummy key
+        if not self.api_key or self.api_key.startswith('your_'):
+            logger.warning("No valid Google API key found. Using fallback mode.")
+            logger.warning("   💡 Please create a .env file with GOOGLE_API_KEY=your_actual_key")
+            logger.warning("   💡 Get your key from: https://makersuite.google.com/app/apikey")
+            self.api_key = "dummy_key_for_testing"
+            return None
+        
+        try:
+            from google import genai
+            http_options = self._http_options()
+            try:
+                client = genai.Client(api_key=self.api_key, http_options=http_options)
+            except Exception as e:
+                if http_options is None:
+                    raise
+                logger.warning("HTTP/2 Gemini transport unavailable, using the SDK default: %s", e)
+                client = genai.Client(api_key=self.api_key)
+            logger.info("🔑 Google Gemini client initialized (model: %s, http2: %s)", self.model, http_options is not None)
+            return client
+        except Exception as e:
+            logger.warning("Failed to initialize Gemini client: %s", e)
+            logger.warning("   💡 Check your API key and internet connection")
+            return None
+    
+    @staticmethod
+    def _http_options() -> Optional[Dict[str, Any]]:
+        """Multiplex async Gemini calls over pooled HTTP/2 connections when httpx's h2 extra is installed"""
+        try:
+            import h2  # noqa: F401 - httpx's optional HTTP/2 backend
+            import httpx
+        except ImportError:
+            return None
+        
+        limits = httpx.Limits(
+            max_connections=Config.GEMINI_MAX_CONCURRENCY,
+            max_keepalive_connections=Config.GEMINI_MAX_CONCURRENCY
+        )
+        return {"async_client_args": {"http2": True, "limits": limits}}
     
     def generate_brd_from_input(self, user_input: str, model: str = None) -> Dict[str, Any]:
         """
@@ -134,9 +284,11 @@ CRITICAL: You MUST generate meaningful content for each section based on the pro
         Returns:
             Dictionary containing BRD data
         """
-        logger.info(f"Starting BRD generation...")
-        logger.info(f"   Input length: {len(user_input)} characters")
-        logger.info(f"   Model: {model or self.model}")
+        logger.info("Starting BRD generation (input: %s characters, model: %s)", len(user_input), model or self.model)
+        
+        # Near-empty descriptions only ever produce an empty BRD; don't spend a Gemini call on them
+        if self._is_input_too_short(user_input):
+            return self._get_empty_brd_structure()
         
         # Check if Gemini client is available
         if not self.client:
@@ -145,28 +297,25 @@ CRITICAL: You MUST generate meaningful content for each section based on the pro
             logger.error("   💡 Or set it as an environment variable")
             return self._get_empty_brd_structure()
         
+        # Repeated inputs (UI retries, re-submits) skip the API round-trip entirely
+        cache_key = brd_result_cache.cache_key(model or self.model, user_input)
+        cached = brd_result_cache.get(cache_key)
+        if cached is not None:
+            logger.info("   ✅ Returning cached BRD data")
+            return copy.deepcopy(cached)
+        
         # Use only Gemini generation - no fallbacks
         try:
-            logger.info("   Attempting Gemini generation...")
+            logger.debug("   Attempting Gemini generation...")
             result = self._generate_with_gemini(user_input, model)
             logger.info("   ✅ Gemini generation successful")
-            
-            # Validate and fix the result structure
-            if self._validate_brd_structure(result):
-                logger.info("   ✅ BRD structure validated and fixed")
-                logger.info(f"   📊 Final structure: project_name='{result.get('project_name', 'MISSING')}', stakeholders={len(result.get('stakeholders', []))}, objectives={len(result.get('objectives', []))}")
-                return result
-            else:
-                logger.warning("   ⚠️ BRD structure validation failed, using fallback")
-                return self._get_empty_brd_structure()
+            # _generate_with_gemini has already validated and fixed the structure
+            return self._remember_result(cache_key, result)
                 
         except Exception as e:
-            logger.error(f"❌ Gemini generation failed: {str(e)}")
-            logger.error(f"   💡 This could be due to:")
-            logger.error(f"      - Poor AI response quality")
-            logger.error(f"      - Invalid JSON format")
-            logger.error(f"      - API connection issues")
-            logger.error(f"      - Insufficient project description")
+            logger.error("❌ Gemini generation failed: %s", e)
+            logger.error("   💡 This could be due to poor AI response quality, invalid JSON, "
+                         "API connection issues or an insufficient project description")
             
             # Try with a simpler, more direct prompt
             try:
@@ -174,13 +323,228 @@ CRITICAL: You MUST generate meaningful content for each section based on the pro
                 result = self._generate_with_simplified_prompt(user_input, model)
                 if self._validate_brd_structure(result):
                     logger.info("   ✅ Retry successful with simplified prompt")
-                    return result
+                    return self._remember_result(cache_key, result)
             except Exception as retry_error:
-                logger.error(f"   ❌ Retry also failed: {str(retry_error)}")
+                logger.error("   ❌ Retry also failed: %s", retry_error)
             
             # Return empty structure if all attempts fail
             return self._get_empty_brd_structure()
     
+    async def agenerate_brd_from_input(self, user_input: str, model: str = None) -> Dict[str, Any]:
+        """
+        Async variant of generate_brd_from_input for callers running on an event loop
+        
+        Args:
+            user_input: User's project description
+            model: Specific model to use (optional, uses default if not specified)
+            
+        Returns:
+            Dictionary containing BRD data
+        """
+        logger.info("Starting async BRD generation (input: %s characters, model: %s)", len(user_input), model or self.model)
+        
+        # Near-empty descriptions only ever produce an empty BRD; don't spend a Gemini call on them
+        if self._is_input_too_short(user_input):
+            return self._get_empty_brd_structure()
+        
+        if not self.client:
+            logger.error("❌ Gemini client not available - check API key configuration")
+            return self._get_empty_brd_structure()
+        
+        cache_key = brd_result_cache.cache_key(model or self.model, user_input)
+        cached = brd_result_cache.get(cache_key)
+        if cached is not None:
+            logger.info("   ✅ Returning cached BRD data")
+            return copy.deepcopy(cached)
+        
+        try:
+            result = await self._agenerate_with_gemini(user_input, model)
+            logger.info("   ✅ Gemini generation successful")
+            return self._remember_result(cache_key, result)
+        except Exception as e:
+            logger.error("❌ Gemini generation failed: %s", e)
+            
+            # Try with a simpler, more direct prompt (rare path, so the sync call runs in a worker thread)
+            try:
+                logger.info("   🔄 Attempting retry with simplified prompt...")
+                async with self._gemini_semaphore:
+                    result = await asyncio.to_thread(self._generate_with_simplified_prompt, user_input, model)
+                if self._validate_brd_structure(result):
+                    logger.info("   ✅ Retry successful with simplified prompt")
+                    return self._remember_result(cache_key, result)
+            except Exception as retry_error:
+                logger.error("   ❌ Retry also failed: %s", retry_error)
+            
+            return self._get_empty_brd_structure()
+    
+    @staticmethod
+    def _is_input_too_short(user_input: str) -> bool:
+        """Whether the input has too little content to be worth sending to Gemini"""
+        length = len(user_input.strip())
+        if length < Config.MIN_PROJECT_DESCRIPTION_LENGTH:
+            logger.warning("⚠️ Input too short for BRD generation (%s characters), skipping Gemini call", length)
+            return True
+        return False
+    
+    @staticmethod
+    def _remember_result(cache_key: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Cache a generated BRD that is complete enough to reuse; callers mutate what we return, so store a private copy"""
+        # Same bar as the route cache: a mostly-empty BRD should be regenerated on retry, not replayed
+        if BusinessRequirementAgent().get_completeness_score(result)['is_complete']:
+            brd_result_cache.set(cache_key, copy.deepcopy(result))
+        else:
+            logger.info("   ⚠️ BRD too incomplete to cache, the next request will call Gemini again")
+        return result
+    
+    async def agenerate_brd_batch(self, user_inputs: List[str], model: str = None, offline: bool = False) -> List[Union[Dict[str, Any], BaseException]]:
+        """
+        Generate BRDs for several inputs, returning results (or exceptions) in input order
+        
+        With offline=True the inputs are submitted as a single Gemini batch job, which is
+        cheaper but can take minutes to hours; use it only when nobody is waiting on the result.
+        """
+        if offline:
+            return await self.agenerate_brd_batch_offline(user_inputs, model)
+        return await asyncio.gather(
+            *(self.agenerate_brd_from_input(user_input, model) for user_input in user_inputs),
+            return_exceptions=True
+        )
+    
+    def generate_brd_multi(self, user_inputs: List[str], model: str = None) -> List[Dict[str, Any]]:
+        """
+        Generate BRDs for several related project descriptions with a single Gemini call
+        
+        Saves a round-trip and a copy of the system prompt per extra input, at the cost of
+        sharing one response's output budget. Entries missing from the returned array get the
+        empty BRD structure; if the array can't be parsed at all, each input is generated on its own.
+        """
+        if not user_inputs:
+            return []
+        if len(user_inputs) == 1:
+            return [self.generate_brd_from_input(user_inputs[0], model)]
+        if not self.client:
+            logger.error("❌ Gemini client not available - check API key configuration")
+            return [self._get_empty_brd_structure() for _ in user_inputs]
+        
+        model_name = model or self.model
+        projects = json.dumps(
+            [{"idx": index, "desc": user_input} for index, user_input in enumerate(user_inputs)],
+            ensure_ascii=False
+        )
+        contents = "".join((_MULTI_PROJECT_PREFIX, projects))
+        
+        try:
+            cache_name = self._get_prompt_cache(model_name)
+            if cache_name:
+                request = {"model": model_name, "contents": contents, "config": {"cached_content": cache_name}}
+            else:
+                request = {"model": model_name, "contents": "".join((self.system_prompt, "\n\n", contents))}
+            content = self._generate_text(request)
+            
+            try:
+                items = _json_loads(content)
+            except json.JSONDecodeError:
+                extracted_json = _JsonBlobScanner('[').feed(content)
+                if extracted_json is None:
+                    raise
+                items = _json_loads(extracted_json)
+            if not isinstance(items, list):
+                raise Exception("Expected a JSON array of BRD objects")
+        except Exception as e:
+            logger.warning("⚠️ Multi-project generation failed, generating each input separately: %s", e)
+            return [self.generate_brd_from_input(user_input, model) for user_input in user_inputs]
+        
+        logger.info("✅ Generated %s BRDs in one Gemini call (%s returned)", len(user_inputs), len(items))
+        results = []
+        for index in range(len(user_inputs)):
+            item = items[index] if index < len(items) else None
+            if isinstance(item, dict) and self._validate_brd_structure(item):
+                results.append(item)
+            else:
+                logger.warning("   ⚠️ Multi-project item %s missing or malformed, using empty structure", index)
+                results.append(self._get_empty_brd_structure())
+        return results
+    
+    def generate_brd_batch_offline(self, user_inputs: List[str], model: str = None) -> List[Dict[str, Any]]:
+        """
+        Generate BRDs for many inputs through Gemini's inline batch mode
+        
+        Blocks until the batch job finishes. Inputs whose response is missing or
+        unparseable get the empty BRD structure, so the result always lines up with user_inputs.
+        """
+        if not user_inputs:
+            return []
+        if not self.client:
+            logger.error("❌ Gemini client not available - check API key configuration")
+            return [self._get_empty_brd_structure() for _ in user_inputs]
+        
+        job = self.client.batches.create(**self._batch_job_args(user_inputs, model))
+        logger.info("📦 Submitted Gemini batch job %s with %s requests", job.name, len(user_inputs))
+        
+        deadline = time.time() + Config.BATCH_TIMEOUT_SECONDS
+        while not self._batch_job_done(job, deadline):
+            time.sleep(Config.BATCH_POLL_INTERVAL_SECONDS)
+            job = self.client.batches.get(name=job.name)
+        
+        return self._batch_job_results(job, len(user_inputs))
+    
+    async def agenerate_brd_batch_offline(self, user_inputs: List[str], model: str = None) -> List[Dict[str, Any]]:
+        """Async generate_brd_batch_offline: polls with asyncio.sleep so no thread is held while the job runs"""
+        if not user_inputs:
+            return []
+        if not self.client:
+            logger.error("❌ Gemini client not available - check API key configuration")
+            return [self._get_empty_brd_structure() for _ in user_inputs]
+        
+        job = await self.client.aio.batches.create(**self._batch_job_args(user_inputs, model))
+        logger.info("📦 Submitted Gemini batch job %s with %s requests", job.name, len(user_inputs))
+        
+        deadline = time.time() + Config.BATCH_TIMEOUT_SECONDS
+        while not self._batch_job_done(job, deadline):
+            await asyncio.sleep(Config.BATCH_POLL_INTERVAL_SECONDS)
+            job = await self.client.aio.batches.get(name=job.name)
+        
+        return self._batch_job_results(job, len(user_inputs))
+    
+    def _batch_job_args(self, user_inputs: List[str], model: str = None) -> Dict[str, Any]:
+        """Keyword arguments for batches.create with one inline request per input"""
+        requests = [
+            {"contents": [{"role": "user", "parts": [{"text": self._full_prompt(user_input)}]}]}
+            for user_input in user_inputs
+        ]
+        return {
+            "model": model or self.model,
+            "src": requests,
+            "config": {"display_name": f"brd-batch-{int(time.time())}"}
+        }
+    
+    def _batch_job_done(self, job, deadline: float) -> bool:
+        """True once the batch job succeeded; raises if it failed or the deadline passed first"""
+        state = getattr(job.state, 'name', job.state)
+        if state not in _BATCH_DONE_STATES:
+            if time.time() >= deadline:
+                raise Exception(f"Gemini batch job {job.name} timed out in state {state}")
+            return False
+        if state != 'JOB_STATE_SUCCEEDED':
+            raise Exception(f"Gemini batch job {job.name} finished with state {state}")
+        logger.info("   ✅ Gemini batch job %s succeeded", job.name)
+        return True
+    
+    def _batch_job_results(self, job, count: int) -> List[Dict[str, Any]]:
+        """Parse a finished batch job's inline responses, one BRD per input"""
+        inlined = (job.dest.inlined_responses if job.dest else None) or []
+        results = []
+        for index in range(count):
+            try:
+                item = inlined[index]
+                if item.error:
+                    raise Exception(item.error)
+                results.append(self._parse_brd_response(self._response_text(item.response)))
+            except Exception as e:
+                logger.warning("   ⚠️ Batch item %s failed, using empty structure: %s", index, e)
+                results.append(self._get_empty_brd_structure())
+        return results
+    
     def _generate_with_gemini(self, user_input: str, model: str = None, expect_json: bool = True) -> Union[Dict[str, Any], str]:
         """Generate content using Google Gemini API"""
         # Check if Gemini client is available
@@ -192,174 +556,260 @@ CRITICAL: You MUST generate meaningful content for each section based on the pro
             # Use specified model or default
             selected_model = model or self.model
             
-            logger.info("   🔑 Using Google Gemini API...")
-            logger.info(f"   📝 Model: {selected_model}")
-            logger.info(f"   🌡️ Temperature: {Config.LLM_TEMPERATURE}")
-            logger.info(f"   📏 Max tokens: {Config.MAX_OUTPUT_TOKENS}")
-            
-            # Prepare the prompt for pure AI generation
-            full_prompt = f"{self.system_prompt}\n\nUser's Project Description:\n{user_input}\n\nBased on this project description, please generate a comprehensive BRD structure. Analyze the description carefully and provide meaningful content for each section. Respond with valid JSON only:"
+            logger.debug(
+                "   🔑 Using Google Gemini API (model: %s, temperature: %s, max tokens: %s)",
+                selected_model, Config.LLM_TEMPERATURE, Config.MAX_OUTPUT_TOKENS
+            )
             
-            logger.info(f"   📋 Prompt length: {len(full_prompt)} characters")
-            logger.info(f"   📋 User input: {user_input[:100]}{'...' if len(user_input) > 100 else ''}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("   📋 Prompt length: %s characters", len(self._prompt_prefix) + len(user_input) + len(_USER_BLOCK_SUFFIX))
+                logger.debug("   📋 User input: %s", _preview(user_input, 100))
             
             # Generate content using Gemini
-            logger.info("   🚀 Calling Gemini API...")
+            logger.debug("   🚀 Calling Gemini API...")
             # For google-genai library, we need to use the correct model format
             # The library expects just the model name without 'models/' prefix
             model_name = selected_model
             
-            logger.info(f"   🔧 Using model: {model_name}")
-            
-                        # Generate content using Gemini API
-            response = self.client.models.generate_content(
-                model=model_name,
-                contents=full_prompt
-            )
-            
-            # Handle different response formats
-            logger.info(f"   🔍 Response type: {type(response)}")
-            logger.info(f"   🔍 Response attributes: {dir(response)}")
+            # Generate content using Gemini API, reusing the cached system prompt when available
+            cache_name = self._get_prompt_cache(model_name)
+            if cache_name:
+                logger.debug("   💾 Using cached system prompt: %s", cache_name)
+            # JSON responses are streamed so we stop reading as soon as the object is complete
+            generate = self._generate_json_text if expect_json else self._generate_text
+            try:
+                content = generate(self._build_request(model_name, user_input, cache_name))
+            except Exception as e:
+                if not (cache_name and self._is_missing_cache_error(e)):
+                    raise
+                logger.info("   ♻️ Cached system prompt %s is gone, recreating...", cache_name)
+                cache_name = self._get_prompt_cache(model_name, stale=cache_name)
+                content = generate(self._build_request(model_name, user_input, cache_name))
             
-            if hasattr(response, 'text') and response.text:
-                content = response.text
-                logger.info("   ✅ Gemini API successful (text format)")
-                logger.info(f"   📄 Response length: {len(content)} characters")
-                logger.info(f"   📄 Response preview: {content[:200]}{'...' if len(content) > 200 else ''}")
-            elif hasattr(response, 'candidates') and response.candidates:
-                # Handle different response format
-                content = response.candidates[0].content.parts[0].text
-                logger.info("   ✅ Gemini API successful (candidates format)")
-                logger.info(f"   📄 Response length: {len(content)} characters")
-                logger.info(f"   📄 Response preview: {content[:200]}{'...' if len(content) > 200 else ''}")
-            elif hasattr(response, 'parts') and response.parts:
-                # Handle parts format
-                content = response.parts[0].text
-                logger.info("   ✅ Gemini API successful (parts format)")
-                logger.info(f"   📄 Response length: {len(content)} characters")
-                logger.info(f"   📄 Response preview: {content[:200]}{'...' if len(content) > 200 else ''}")
-            else:
-                logger.error("   ❌ Unexpected response format")
-                logger.error(f"   🔍 Response: {response}")
-                raise Exception("Unexpected response format from Gemini API")
+            return self._parse_brd_response(content) if expect_json else content
+                
+        except Exception as e:
+            error_msg = f"Gemini generation failed: {str(e)}"
+            logger.error("   ❌ %s", error_msg)
+            raise Exception(error_msg)
+    
+    async def _agenerate_with_gemini(self, user_input: str, model: str = None, expect_json: bool = True) -> Union[Dict[str, Any], str]:
+        """Async variant of _generate_with_gemini using the non-blocking Gemini client"""
+        if not self.client:
+            logger.error("Gemini client not available")
+            raise Exception("Gemini client not configured")
+        
+        try:
+            model_name = model or self.model
             
-            if expect_json:
-                # Parse JSON response
+            cache_name = await self._aget_prompt_cache(model_name)
+            async with self._gemini_semaphore:
+                logger.debug("   🚀 Calling Gemini API (async) with model: %s", model_name)
+                agenerate = self._agenerate_json_text if expect_json else self._agenerate_text
                 try:
-                    logger.info("   🔍 Attempting to parse JSON response...")
-                    brd_data = json.loads(content)
-                    logger.info("   ✅ JSON parsed successfully")
-                    # Validate that we have a proper structure
-                    if self._validate_brd_structure(brd_data):
-                        logger.info("   ✅ BRD structure validation passed")
-                        return brd_data
-                    else:
-                        logger.error("   ❌ BRD structure validation failed")
-                        raise Exception("Invalid BRD structure returned by Gemini")
-                except json.JSONDecodeError as json_error:
-                    logger.error(f"   ❌ JSON parsing failed: {json_error}")
-                    logger.info("   🔍 Attempting to extract JSON from response...")
-                    # Try to extract JSON from the response
-                    json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                    if json_match:
-                        try:
-                            extracted_json = json_match.group()
-                            logger.info(f"   📄 Extracted JSON: {extracted_json[:200]}{'...' if len(extracted_json) > 200 else ''}")
-                            parsed_data = json.loads(extracted_json)
-                            if self._validate_brd_structure(parsed_data):
-                                logger.info("   ✅ Extracted JSON validation passed")
-                                return parsed_data
-                            else:
-                                logger.error("   ❌ Extracted JSON validation failed")
-                        except Exception as extract_error:
-                            logger.error(f"   ❌ Extracted JSON parsing failed: {extract_error}")
-                    raise Exception("Failed to parse Gemini response as valid JSON")
-            else:
-                # Return plain text for section content
-                return content
+                    content = await agenerate(self._build_request(model_name, user_input, cache_name))
+                except Exception as e:
+                    if not (cache_name and self._is_missing_cache_error(e)):
+                        raise
+                    logger.info("   ♻️ Cached system prompt %s is gone, recreating...", cache_name)
+                    cache_name = await self._aget_prompt_cache(model_name, stale=cache_name)
+                    content = await agenerate(self._build_request(model_name, user_input, cache_name))
+            
+            return self._parse_brd_response(content) if expect_json else content
                 
         except Exception as e:
             error_msg = f"Gemini generation failed: {str(e)}"
-            logger.error(f"   ❌ {error_msg}")
+            logger.error("   ❌ %s", error_msg)
             raise Exception(error_msg)
     
-    def _validate_brd_structure(self, brd_data: Dict[str, Any]) -> bool:
-        """Validate that the BRD data has the correct structure and fix missing elements"""
-        logger.info(f"   🔍 Validating BRD structure...")
-        logger.info(f"   📊 Input structure: {list(brd_data.keys()) if isinstance(brd_data, dict) else 'NOT A DICT'}")
+    @staticmethod
+    def _response_text(response: Any) -> str:
+        """Extract the generated text from a Gemini response"""
+        # Handle different response formats
         
-        required_keys = [
-            'project_name', 'stakeholders', 'objectives', 'scope', 
-            'requirements', 'assumptions', 'constraints', 'success_criteria'
-        ]
+        if hasattr(response, 'text') and response.text:
+            content = response.text
+            logger.debug("   ✅ Gemini API successful (text format)")
+        elif hasattr(response, 'candidates') and response.candidates:
+            # Handle different response format
+            content = response.candidates[0].content.parts[0].text
+            logger.debug("   ✅ Gemini API successful (candidates format)")
+        elif hasattr(response, 'parts') and response.parts:
+            # Handle parts format
+            content = response.parts[0].text
+            logger.debug("   ✅ Gemini API successful (parts format)")
+        else:
+            logger.error("   ❌ Unexpected response format")
+            logger.error("   🔍 Response: %s", response)
+            raise Exception("Unexpected response format from Gemini API")
         
-        # Check if all required keys exist and add missing ones
-        for key in required_keys:
-            if key not in brd_data:
-                logger.info(f"   ⚠️ Missing key: {key}")
-                if key == 'project_name':
-                    # Project name is critical - try to infer from input or use default
-                    brd_data[key] = "Project"
-                    logger.info(f"   ✅ Added default project_name: {brd_data[key]}")
-                elif key == 'scope':
-                    brd_data[key] = {'in_scope': [], 'out_scope': []}
-                    logger.info(f"   ✅ Added default scope structure")
-                elif key == 'requirements':
-                    brd_data[key] = {'business': [], 'functional': [], 'non_functional': []}
-                    logger.info(f"   ✅ Added default requirements structure")
-                else:
-                    brd_data[key] = []
-                    logger.info(f"   ✅ Added empty list for {key}")
-        
-        # Ensure scope and requirements have the right nested structure
-        if not isinstance(brd_data.get('scope'), dict):
-            logger.info(f"   ⚠️ Scope is not a dict, fixing...")
-            brd_data['scope'] = {'in_scope': [], 'out_scope': []}
-        
-        scope_keys = ['in_scope', 'out_scope']
-        for key in scope_keys:
-            if key not in brd_data['scope']:
-                brd_data['scope'][key] = []
-        
-        if not isinstance(brd_data.get('requirements'), dict):
-            logger.info(f"   ⚠️ Requirements is not a dict, fixing...")
-            brd_data['requirements'] = {'business': [], 'functional': [], 'non_functional': []}
-        
-        req_keys = ['business', 'functional', 'non_functional']
-        for key in req_keys:
-            if key not in brd_data['requirements']:
-                brd_data['requirements'][key] = []
-        
-        # Ensure all values are lists
-        for key in ['stakeholders', 'objectives', 'assumptions', 'constraints', 'success_criteria']:
-            if not isinstance(brd_data.get(key), list):
-                logger.info(f"   ⚠️ {key} is not a list, fixing...")
-                brd_data[key] = []
-        
-        # Ensure project_name is a string
-        if not isinstance(brd_data.get('project_name'), str) or not brd_data['project_name'].strip():
-            logger.info(f"   ⚠️ Project name is invalid, setting default...")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("   📄 Response length: %s characters", len(content))
+            logger.debug("   📄 Response preview: %s", _preview(content, 200))
+        return content
+    
+    def _parse_brd_response(self, content: str) -> Dict[str, Any]:
+        """Parse and validate the BRD JSON in a Gemini response"""
+        try:
+            logger.debug("   🔍 Attempting to parse JSON response...")
+            brd_data = _json_loads(content)
+            logger.debug("   ✅ JSON parsed successfully")
+            # Validate that we have a proper structure
+            if self._validate_brd_structure(brd_data):
+                logger.debug("   ✅ BRD structure validation passed")
+                return brd_data
+            else:
+                logger.error("   ❌ BRD structure validation failed")
+                raise Exception("Invalid BRD structure returned by Gemini")
+        except json.JSONDecodeError as json_error:
+            logger.error("   ❌ JSON parsing failed: %s", json_error)
+            logger.debug("   🔍 Attempting to extract JSON from response...")
+            # Try to extract JSON from the response
+            extracted_json = _extract_json_blob(content)
+            if extracted_json:
+                try:
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("   📄 Extracted JSON: %s", _preview(extracted_json, 200))
+                    parsed_data = _json_loads(extracted_json)
+                    if self._validate_brd_structure(parsed_data):
+                        logger.debug("   ✅ Extracted JSON validation passed")
+                        return parsed_data
+                    else:
+                        logger.error("   ❌ Extracted JSON validation failed")
+                except Exception as extract_error:
+                    logger.error("   ❌ Extracted JSON parsing failed: %s", extract_error)
+            raise Exception("Failed to parse Gemini response as valid JSON")
+    
+    def _full_prompt(self, user_input: str) -> str:
+        """System prompt followed by the user block, joined in a single allocation"""
+        return "".join((self._prompt_prefix, user_input, _USER_BLOCK_SUFFIX))
+    
+    def _build_request(self, model_name: str, user_input: str, cache_name: Optional[str]) -> Dict[str, Any]:
+        """Build generate_content kwargs, sending only the user block when the system prompt is cached"""
+        if cache_name:
+            contents = "".join((_USER_BLOCK_PREFIX, user_input, _USER_BLOCK_SUFFIX))
+            return {"model": model_name, "contents": contents, "config": {"cached_content": cache_name}}
+        # Static system prompt strictly first so Gemini's implicit prefix caching can still apply
+        return {"model": model_name, "contents": self._full_prompt(user_input)}
+    
+    def _generate_text(self, request: Dict[str, Any]) -> str:
+        """Single-shot generation for free-text responses"""
+        return self._response_text(self.client.models.generate_content(**request))
+    
+    def _generate_json_text(self, request: Dict[str, Any]) -> str:
+        """Stream a JSON response, closing the stream once the first object is complete"""
+        scanner = _JsonBlobScanner()
+        stream = self.client.models.generate_content_stream(**request)
+        try:
+            for chunk in stream:
+                blob = scanner.feed(chunk.text or "")
+                if blob is not None:
+                    logger.debug("   ✂️ JSON object complete, closing stream")
+                    return blob
+        finally:
+            stream.close()
+        return scanner.text
+    
+    async def _agenerate_text(self, request: Dict[str, Any]) -> str:
+        """Async variant of _generate_text"""
+        return self._response_text(await self.client.aio.models.generate_content(**request))
+    
+    async def _agenerate_json_text(self, request: Dict[str, Any]) -> str:
+        """Async variant of _generate_json_text"""
+        scanner = _JsonBlobScanner()
+        stream = await self.client.aio.models.generate_content_stream(**request)
+        try:
+            async for chunk in stream:
+                blob = scanner.feed(chunk.text or "")
+                if blob is not None:
+                    logger.debug("   ✂️ JSON object complete, closing stream")
+                    return blob
+        finally:
+            await stream.aclose()
+        return scanner.text
+    
+    @staticmethod
+    def _is_missing_cache_error(error: Exception) -> bool:
+        """Whether a Gemini error means the referenced cached content has expired or been deleted"""
+        return getattr(error, 'code', None) in (403, 404)
+    
+    def _get_prompt_cache(self, model_name: str, stale: Optional[str] = None) -> Optional[str]:
+        """
+        Return the name of an explicit Gemini cache holding the system prompt, or None
+        
+        Pass the name of a cache the API rejected as stale to force it to be recreated.
+        """
+        key = (model_name, self._system_prompt_hash)
+        
+        with self._prompt_cache_lock:
+            entry = self._usable_prompt_cache(model_name, stale)
+            if entry is not None:
+                return entry[0]
+            
+            now = time.time()
+            # Creating under the lock keeps concurrent first requests from each paying for a cache
+            ttl = Config.PROMPT_CACHE_TTL_SECONDS
+            try:
+                cache = self.client.caches.create(
+                    model=model_name,
+                    config={"system_instruction": self.system_prompt, "ttl": f"{ttl}s"}
+                )
+                # Refresh a minute early so requests never reference an expired cache
+                self._prompt_caches[key] = (cache.name, now + ttl - 60)
+                logger.info("   💾 Created Gemini prompt cache for %s: %s", model_name, cache.name)
+                return cache.name
+            except Exception as e:
+                # Caching is an optimization only (e.g. prompt below the model's minimum cache size);
+                # remember the miss so we don't retry on every request
+                logger.info("   ⚠️ Prompt caching unavailable for %s: %s", model_name, e)
+                self._prompt_caches[key] = (None, now + ttl)
+                return None
+    
+    def _usable_prompt_cache(self, model_name: str, stale: Optional[str] = None) -> Optional[tuple]:
+        """Return the remembered (cache name, expiry) for model_name if it can still be used, without any API call"""
+        entry = self._prompt_caches.get((model_name, self._system_prompt_hash))
+        if entry is not None and entry[1] > time.time() and (stale is None or entry[0] != stale):
+            return entry
+        return None
+    
+    async def _aget_prompt_cache(self, model_name: str, stale: Optional[str] = None) -> Optional[str]:
+        """Async _get_prompt_cache: answers from memory on the loop and only uses a worker thread to create a cache"""
+        entry = self._usable_prompt_cache(model_name, stale)
+        if entry is not None:
+            return entry[0]
+        return await asyncio.to_thread(self._get_prompt_cache, model_name, stale)
+    
+    def _validate_brd_structure(self, brd_data: Dict[str, Any]) -> bool:
+        """Validate that the BRD data has the correct structure, fixing missing or mistyped sections in place"""
+        project_name = brd_data.get('project_name')
+        if not isinstance(project_name, str) or not project_name.strip():
             brd_data['project_name'] = "Project"
         
-        # Check content quality and warn about poor AI responses
+        # Walk the sections in document order so any defaults are appended in that order too
         empty_sections = []
-        if not brd_data.get('stakeholders') or len(brd_data.get('stakeholders', [])) == 0:
-            empty_sections.append('stakeholders')
-        if not brd_data.get('objectives') or len(brd_data.get('objectives', [])) == 0:
-            empty_sections.append('objectives')
-        if not brd_data.get('assumptions') or len(brd_data.get('assumptions', [])) == 0:
-            empty_sections.append('assumptions')
-        if not brd_data.get('constraints') or len(brd_data.get('constraints', [])) == 0:
-            empty_sections.append('constraints')
-        if not brd_data.get('success_criteria') or len(brd_data.get('success_criteria', [])) == 0:
-            empty_sections.append('success_criteria')
+        for key in _BRD_SECTION_ORDER:
+            sub_keys = _NESTED_BRD_SECTIONS.get(key)
+            value = brd_data.get(key)
+            if sub_keys:
+                if not isinstance(value, dict):
+                    brd_data[key] = value = {}
+                for sub_key in sub_keys:
+                    if sub_key not in value:
+                        value[sub_key] = []
+            else:
+                if not isinstance(value, list):
+                    brd_data[key] = value = []
+                if not value:
+                    empty_sections.append(key)
         
+        # Check content quality and warn about poor AI responses
         if empty_sections:
-            logger.warning(f"   ⚠️ Empty sections detected: {empty_sections} - This may indicate poor AI response quality")
-        
-        logger.info(f"   ✅ BRD structure validation complete")
-        logger.info(f"   📊 Final structure: project_name='{brd_data.get('project_name')}', stakeholders={len(brd_data.get('stakeholders', []))}, objectives={len(brd_data.get('objectives', []))}")
+            logger.warning("   ⚠️ Empty sections detected: %s - This may indicate poor AI response quality", empty_sections)
         
+        logger.debug(
+            "   📊 Validated BRD structure: project_name='%s', stakeholders=%s, objectives=%s",
+            brd_data['project_name'], len(brd_data['stakeholders']), len(brd_data['objectives'])
+        )
         return True
     
     def _generate_with_simplified_prompt(self, user_input: str, model: str = None) -> Dict[str, Any]:
@@ -397,16 +847,16 @@ Respond with ONLY this JSON structure:
             if response.text:
                 content = response.text
                 # Try to extract JSON
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
+                extracted_json = _extract_json_blob(content)
+                if extracted_json:
                     try:
-                        return json.loads(json_match.group())
+                        return _json_loads(extracted_json)
                     except:
                         pass
                 
                 # If no JSON found, try to parse the whole response
                 try:
-                    return json.loads(content)
+                    return _json_loads(content)
                 except:
                     pass
                 
@@ -438,34 +888,10 @@ Respond with ONLY this JSON structure:
     def _create_brd_schema(self, brd_data: Dict[str, Any]) -> BRDSchema:
         """Create BRDSchema object from parsed data"""
         try:
-            return BRDSchema(
-                project_name=brd_data.get('project_name', 'Unknown Project'),
-                stakeholders=brd_data.get('stakeholders', []),
-                objectives=brd_data.get('objectives', []),
-                scope_in=brd_data.get('scope', {}).get('in_scope', []),
-                scope_out=brd_data.get('scope', {}).get('out_scope', []),
-                business_requirements=brd_data.get('requirements', {}).get('business', []),
-                functional_requirements=brd_data.get('requirements', {}).get('functional', []),
-                non_functional_requirements=brd_data.get('requirements', {}).get('non_functional', []),
-                assumptions=brd_data.get('assumptions', []),
-                constraints=brd_data.get('constraints', []),
-                success_criteria=brd_data.get('success_criteria', [])
-            )
+            return BRDSchema.from_dict(brd_data)
         except Exception as e:
-            logger.error(f"Error creating BRD schema: {e}")
+            logger.error("Error creating BRD schema: %s", e)
             # Return a default schema
-            return BRDSchema(
-                project_name="Default Project",
-                stakeholders=[],
-                objectives=[],
-                scope_in=[],
-                scope_out=[],
-                business_requirements=[],
-                functional_requirements=[],
-                non_functional_requirements=[],
-                assumptions=[],
-                constraints=[],
-                success_criteria=[]
-            )
+            return BRDSchema(project_name="Default Project")
     
 
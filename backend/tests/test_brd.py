@@ -0,0 +1,39 @@
+"""
+Tests for BRD completeness scoring and the prompts built from it
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.brd import BusinessRequirementAgent
+
+
+class CompletenessScoreTests(unittest.TestCase):
+    def setUp(self):
+        self.bra = BusinessRequirementAgent()
+
+    def test_complete_data_reports_percentage(self):
+        brd_data = {
+            'project_name': 'Inventory Portal',
+            'stakeholders': ['Operations'],
+            'objectives': ['Track stock levels'],
+            'scope': {'in_scope': ['Web portal'], 'out_scope': []},
+            'requirements': {'business': ['Reduce stockouts'], 'functional': ['Search items'], 'non_functional': []},
+        }
+        score = self.bra.get_completeness_score(brd_data)
+        self.assertTrue(score['is_complete'])
+        self.assertAlmostEqual(score['completed_fields'] * 100 / score['total_fields'], score['completeness_percentage'])
+
+    def test_intelligent_prompt_formats_percentage(self):
+        for brd_data in ({}, {'project_name': 'Inventory Portal', 'stakeholders': ['Operations']}):
+            score = self.bra.get_completeness_score(brd_data)
+            self.assertIsInstance(score['completeness_percentage'], float)
+            prompt = self.bra.get_intelligent_prompt(brd_data, score)
+            self.assertIn('%.1f' % score['completeness_percentage'], prompt)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+In-process background job queue for long-running BRD generation
+"""
+
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Dict, Optional
+
+from config import Config
+
+
+class JobQueue:
+    """Runs coroutines in the background and keeps their results for polling"""
+
+    def __init__(self, max_jobs: int = 1000, result_ttl_seconds: int = 3600):
+        self.max_jobs = max_jobs
+        self.result_ttl_seconds = result_ttl_seconds
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, coro: Awaitable[Any]) -> str:
+        """Schedule a coroutine on the running event loop and return its task id"""
+        self._purge()
+
+        task_id = uuid.uuid4().hex
+        self.jobs[task_id] = {
+            'status': 'pending',
+            'created_at': time.time(),
+            'finished_at': None,
+            'result': None,
+            'error': None,
+            'status_code': None
+        }
+        # Keep a strong reference so the task isn't garbage collected mid-run
+        self._tasks[task_id] = asyncio.create_task(self._run(task_id, coro))
+        return task_id
+
+    async def _run(self, task_id: str, coro: Awaitable[Any]):
+        """Execute a job and record its outcome"""
+        job = self.jobs[task_id]
+        job['status'] = 'running'
+        try:
+            job['result'] = await coro
+            job['status'] = 'completed'
+        except asyncio.CancelledError:
+            # Shutdown or an explicit cancel - record it rather than leaving the job 'running'
+            job['status'] = 'cancelled'
+            job['error'] = 'Job was cancelled'
+            raise
+        except Exception as e:
+            job['status'] = 'failed'
+            job['error'] = getattr(e, 'detail', str(e))
+            job['status_code'] = getattr(e, 'status_code', 500)
+        finally:
+            job['finished_at'] = time.time()
+            self._tasks.pop(task_id, None)
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Get job state by task id"""
+        return self.jobs.get(task_id)
+
+    def _purge(self):
+        """Drop expired results and, if still over capacity, the oldest finished jobs"""
+        expired_time = time.time() - self.result_ttl_seconds
+        finished = [
+            (job['finished_at'], task_id) for task_id, job in self.jobs.items()
+            if job['finished_at'] is not None
+        ]
+        for finished_at, task_id in finished:
+            if finished_at <= expired_time:
+                del self.jobs[task_id]
+
+        if len(self.jobs) >= self.max_jobs:
+            for finished_at, task_id in sorted(finished):
+                if len(self.jobs) < self.max_jobs:
+                    break
+                self.jobs.pop(task_id, None)
+
+# Global BRD job queue instance
+brd_jobs = JobQueue(
+    max_jobs=Config.JOB_MAX_ENTRIES,
+    result_ttl_seconds=Config.JOB_RESULT_TTL_SECONDS
+)
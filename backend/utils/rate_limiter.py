@@ -4,60 +4,170 @@ Rate limiting utility for API endpoints
 """
 
 import time
-from typing import Dict, Optional
-from collections import defaultdict
+import logging
+import threading
+from typing import List, Optional, Tuple
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
 
 class RateLimiter:
-    """Simple in-memory rate limiter"""
+    """Simple in-memory rate limiter, safe to share between threads"""
+    
+    # Power of two so a client's shard is a mask of its hash
+    _SHARD_COUNT = 64
     
-    def __init__(self, max_requests: int = 100, window_seconds: int = 3600):
+    def __init__(self, max_requests: int = 100, window_seconds: int = 3600, max_clients: int = 100000):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.requests: Dict[str, list] = defaultdict(list)
+        # Each shard is an LRU of client ids so idle clients can't grow memory without bound
+        self._max_clients_per_shard = max(1, -(-max_clients // self._SHARD_COUNT))
+        # Per-client request timestamps (oldest first), split into independently locked shards
+        self._shards: List["OrderedDict[str, deque]"] = [OrderedDict() for _ in range(self._SHARD_COUNT)]
+        self._locks = [threading.Lock() for _ in range(self._SHARD_COUNT)]
     
+    def _shard(self, client_id: str) -> Tuple[threading.Lock, "OrderedDict[str, deque]"]:
+        """Return the lock and timestamp map that own client_id"""
+        index = hash(client_id) & (self._SHARD_COUNT - 1)
+        return self._locks[index], self._shards[index]
+    
+    def _purge(self, timestamps: deque) -> deque:
+        """Drop expired timestamps from the front of a client's queue"""
+        expired_time = time.time() - self.window_seconds
+        while timestamps and timestamps[0] <= expired_time:
+            timestamps.popleft()
+        return timestamps
     
     def is_allowed(self, client_id: str) -> bool:
         """Check if request is allowed for client"""
-        current_time = time.time()
-        expired_time = current_time - self.window_seconds
-        
-        # Clean up expired requests for this client
-        self.requests[client_id] = [
-            req_time for req_time in self.requests[client_id]
-            if req_time > expired_time
-        ]
-        
-        # Check if under limit
-        if len(self.requests[client_id]) < self.max_requests:
-            self.requests[client_id].append(current_time)
-            return True
-        
-        return False
+        lock, requests = self._shard(client_id)
+        with lock:
+            timestamps = requests.get(client_id)
+            if timestamps is None:
+                timestamps = requests[client_id] = deque()
+                # Forget the least recently seen client once the shard is full
+                if len(requests) > self._max_clients_per_shard:
+                    requests.popitem(last=False)
+            else:
+                requests.move_to_end(client_id)
+            self._purge(timestamps)
+            
+            # Check if under limit
+            if len(timestamps) < self.max_requests:
+                timestamps.append(time.time())
+                return True
+            
+            return False
     
     def get_remaining_requests(self, client_id: str) -> int:
         """Get remaining requests for client"""
-        current_time = time.time()
-        expired_time = current_time - self.window_seconds
-        
-        # Clean up expired requests
-        self.requests[client_id] = [
-            req_time for req_time in self.requests[client_id]
-            if req_time > expired_time
-        ]
-        
-        return max(0, self.max_requests - len(self.requests[client_id]))
+        lock, requests = self._shard(client_id)
+        with lock:
+            timestamps = requests.get(client_id)
+            used = len(self._purge(timestamps)) if timestamps else 0
+        return max(0, self.max_requests - used)
     
     def get_reset_time(self, client_id: str) -> Optional[float]:
         """Get time when rate limit resets for client"""
-        if not self.requests[client_id]:
-            return None
-        
-        oldest_request = min(self.requests[client_id])
-        return oldest_request + self.window_seconds
+        lock, requests = self._shard(client_id)
+        with lock:
+            timestamps = requests.get(client_id)
+            if not timestamps:
+                return None
+            
+            # Timestamps are appended in order, so the oldest is at the front
+            return timestamps[0] + self.window_seconds
+    
+    async def acheck(self, client_id: str) -> Tuple[bool, Optional[float]]:
+        """Consume a request for client; returns (allowed, reset time if denied)"""
+        # Purely in-process, so there is nothing to await
+        if self.is_allowed(client_id):
+            return True, None
+        return False, self.get_reset_time(client_id)
+
+class RedisRateLimiter:
+    """Token-bucket rate limiter shared across workers through Redis, driven by a redis.asyncio client"""
+    
+    # Atomically refill the bucket, try to take one token and write it back
+    _TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local consume = tonumber(ARGV[4])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if consume == 1 and tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+if consume == 1 then
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate))
+end
+return {allowed, tostring(tokens)}
+"""
+    
+    def __init__(self, client, max_requests: int = 100, window_seconds: int = 3600, max_clients: int = 100000):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.rate = max_requests / window_seconds
+        self._script = client.register_script(self._TOKEN_BUCKET_SCRIPT)
+        # Used if Redis becomes unreachable so requests are still limited per process
+        self._fallback = RateLimiter(max_requests, window_seconds, max_clients)
+    
+    async def _call(self, client_id: str, consume: bool):
+        """Run the bucket script and return (allowed, tokens)"""
+        allowed, tokens = await self._script(
+            keys=[f"rl:{client_id}"],
+            args=[self.max_requests, self.rate, time.time(), 1 if consume else 0]
+        )
+        return bool(allowed), float(tokens)
+    
+    async def acheck(self, client_id: str) -> Tuple[bool, Optional[float]]:
+        """Consume a request for client; returns (allowed, reset time if denied)"""
+        try:
+            # The consuming call also returns the bucket level, so a denial needs no second round-trip
+            allowed, tokens = await self._call(client_id, consume=True)
+        except Exception as e:
+            logger.warning("Redis rate limiter unavailable, using in-memory fallback: %s", e)
+            return await self._fallback.acheck(client_id)
+        if allowed:
+            return True, None
+        return False, time.time() + (1 - tokens) / self.rate
+
+def _create_rate_limiter():
+    """Use the shared Redis limiter when REDIS_URL is configured, else in-memory"""
+    if Config.REDIS_URL:
+        try:
+            import redis.asyncio as aioredis
+            # Short timeouts so an unreachable Redis costs each request a bounded wait before the fallback
+            client = aioredis.Redis.from_url(
+                Config.REDIS_URL,
+                socket_timeout=Config.REDIS_SOCKET_TIMEOUT_SECONDS,
+                socket_connect_timeout=Config.REDIS_SOCKET_TIMEOUT_SECONDS
+            )
+            return RedisRateLimiter(
+                client,
+                max_requests=Config.RATE_LIMIT_MAX_REQUESTS,
+                window_seconds=Config.RATE_LIMIT_WINDOW_SECONDS,
+                max_clients=Config.RATE_LIMIT_MAX_CLIENTS
+            )
+        except ImportError:
+            logger.warning("REDIS_URL is set but the redis package is not installed - using in-memory rate limiting")
+    
+    return RateLimiter(
+        max_requests=Config.RATE_LIMIT_MAX_REQUESTS, 
+        window_seconds=Config.RATE_LIMIT_WINDOW_SECONDS,
+        max_clients=Config.RATE_LIMIT_MAX_CLIENTS
+    )
 
 # Global rate limiter instance
 from config import Config
-rate_limiter = RateLimiter(
-    max_requests=Config.RATE_LIMIT_MAX_REQUESTS, 
-    window_seconds=Config.RATE_LIMIT_WINDOW_SECONDS
-)
+rate_limiter = _create_rate_limiter()